@@ -1,11 +1,62 @@
+"""
+Host side driver for the arduinounostepper_TMC2209 firmware.
+
+The module is fully type annotated and runs as plain Python. It is not meant to be compiled with mypyc:
+the command methods are attached to ArduinoStepper_TMC2209 at import time, which native classes do not allow.
+"""
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import serial
 import json
+import struct
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from enum import IntEnum
-from typing import Optional
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+from dataclasses import dataclass, replace
+
+if TYPE_CHECKING:
+    from dep.arduinounostepper_TMC2209.AsyncSerialMux import AsyncSerialMux
+
+try:
+    # orjson.JSONDecodeError 繼承自 json.JSONDecodeError，故下方的例外處理不需更動
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+
+# Arduino Uno 的硬體序列埠接收緩衝區大小。一次寫入的未回應命令不可超過此大小，否則會遺失資料
+_ARDUINO_RX_BUFFER_SIZE = 64
+
+# _readline_fast 先忙碌輪詢此秒數，之後改以短暫 sleep 輪詢以讓出 CPU
+_BUSY_POLL_S = 0.0002
+_IDLE_POLL_S = 0.0002
+
+# 二進位協定：命令框為 [0xA5][CommandCode:u8][Value:i32 little endian，僅限需要數值的命令]
+# 回應框為 [success:u8][value:i32 little endian]。JSON 命令以 '{' 開頭，韌體藉由首位元組區分兩種協定
+_BINARY_FRAME_MARKER = 0xA5
+# 框格式只編譯一次，避免每次 pack/unpack 重新解析格式字串
+_BINARY_COMMAND_WITH_VALUE = struct.Struct("<BBi")
+_BINARY_COMMAND_NO_VALUE = struct.Struct("<BB")
+_BINARY_RESPONSE = struct.Struct("<Bi")
+_BINARY_RESPONSE_SIZE = _BINARY_RESPONSE.size
+
+# 連線握手：每次等待回應的秒數與最大嘗試次數。總時間涵蓋 Arduino 被 DTR 重置後約 2 秒的開機時間
+_HANDSHAKE_POLL_S = 0.05
+_HANDSHAKE_ATTEMPTS = 40
+
+# 序號欄位的範圍，超過後從 0 重新開始
+_SEQ_MODULO = 0x10000
+
+# 預設 logger 的格式化與輸出交由背景執行緒處理，避免佔用命令收發路徑
+_log_listener: Optional[logging.handlers.QueueListener] = None
 
 
 class TMC2209Command(IntEnum):
@@ -33,6 +84,33 @@ class TMC2209Command(IntEnum):
     IS_STANDING_STILL = 20
     SENSORLESS_HOMING = 21
     RESET_TO_SAFE_CURRENT = 22
+    BATCH_BEGIN = 23
+    BATCH_COMMIT = 24
+
+_HAS_VALUE: frozenset[TMC2209Command] = frozenset({
+    TMC2209Command.ENABLE,
+    TMC2209Command.SET_HARDWARE_ENABLE_PIN,
+    TMC2209Command.SET_PWM_OFFSET,
+    TMC2209Command.SET_PWM_GRADIENT,
+    TMC2209Command.SET_RUN_CURRENT,
+    TMC2209Command.SET_HOLD_CURRENT,
+    TMC2209Command.SET_STANDSTILL_MODE,
+    TMC2209Command.SET_STALL_GUARD_THRESHOLD,
+    TMC2209Command.SET_MICROSTEPS_PER_STEP,
+    TMC2209Command.SET_MICROSTEPS_PER_STEP_POWER_OF_TWO,
+    TMC2209Command.MOVE_AT_VELOCITY,
+    TMC2209Command.SET_REPLY_DELAY,
+    TMC2209Command.SENSORLESS_HOMING,
+})
+"""Commands whose binary frame carries a Value"""
+
+_NO_VALUE_FRAMES: dict[TMC2209Command, bytes] = {
+    command: f'{{"CommandCode":{command:d}}}\n'.encode('utf-8') for command in TMC2209Command
+}
+"""Pre-encoded JSON lines for commands sent without a Value"""
+
+# 韌體在 BATCH_BEGIN 與 BATCH_COMMIT 之間最多排入的命令數，整批框長不超過 Arduino 接收緩衝區
+_BATCH_CAPACITY = 8
 
 class StandstillMode(IntEnum):
     """Standstill mode values for command 11"""
@@ -42,68 +120,189 @@ class StandstillMode(IntEnum):
     BRAKING = 3
 
 
-@dataclass(slots = True)
+@dataclass(slots = True, frozen = True)
 class _DriverBoardCommand:
     """Structured command for driver board communication"""
     command_code: TMC2209Command
     value: Optional[int] = None
+    seq: Optional[int] = None
     
-    def to_dict(self) -> dict:
+    def to_dict(self) -> dict[str, int]:
         """Convert to dictionary for JSON serialization"""
-        cmd_dict = {"CommandCode": int(self.command_code)}
+        cmd_dict: dict[str, int] = {"CommandCode": self.command_code}
         if self.value is not None:
             cmd_dict["Value"] = self.value
+        if self.seq is not None:
+            cmd_dict["Seq"] = self.seq
         return cmd_dict
     
     def to_json(self) -> str:
         """Convert to JSON string"""
-        return json.dumps(self.to_dict())
-
-
-@dataclass(slots = True)
+        if self.seq is not None:
+            if self.value is None:
+                return f'{{"CommandCode":{self.command_code:d},"Seq":{self.seq:d}}}'
+            return f'{{"CommandCode":{self.command_code:d},"Value":{self.value:d},"Seq":{self.seq:d}}}'
+        if self.value is None:
+            return f'{{"CommandCode":{self.command_code:d}}}'
+        return f'{{"CommandCode":{self.command_code:d},"Value":{self.value:d}}}'
+
+    def to_bytes(self) -> bytes:
+        """Convert to binary frame"""
+        if self.command_code in _HAS_VALUE:
+            return _BINARY_COMMAND_WITH_VALUE.pack(_BINARY_FRAME_MARKER, self.command_code, self.value or 0)
+        return _BINARY_COMMAND_NO_VALUE.pack(_BINARY_FRAME_MARKER, self.command_code)
+
+
+@dataclass(slots = True, frozen = True)
 class _DriverBoardResponse:
     """Structured response from driver board"""
     success: bool
     message: str
     value: Optional[int] = None
+    seq: Optional[int] = None
     
     @classmethod
-    def from_dict(cls, data: dict) -> '_DriverBoardResponse':
-        """Create response from dictionary"""
+    def from_dict(cls, data: dict[str, Any]) -> '_DriverBoardResponse':
+        """Create response from dictionary. The firmware always sends success, message and value, and seq only if the command carried one."""
         return cls(
-            success=data.get('success', False),
-            message=data.get('message', ''),
-            value=data.get('value')
+            success=data['success'],
+            message=data['message'],
+            value=data['value'],
+            seq=data.get('seq')
         )
     
     @classmethod
-    def from_json(cls, json_str: str) -> '_DriverBoardResponse':
+    def from_json(cls, json_str: str | bytes) -> '_DriverBoardResponse':
         """Create response from JSON string"""
         try:
-            data = json.loads(json_str)
+            data: dict[str, Any] = _json_loads(json_str)
             return cls.from_dict(data)
-        except json.JSONDecodeError:
-            return cls(success=False, message="JSON parse error", value=None)
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return _RESP_JSON_PARSE_ERROR
+
+    @classmethod
+    def from_bytes(cls, frame: bytes) -> '_DriverBoardResponse':
+        """Create response from binary frame"""
+        success: int
+        value: int
+        success, value = _BINARY_RESPONSE.unpack_from(frame)
+        return cls(success=bool(success), message="OK" if success else "Failed", value=value)
+
+# 固定內容的錯誤回應只建立一次並共用；dataclass 為 frozen，共用同一物件是安全的
+_RESP_NO_RESPONSE = _DriverBoardResponse(success=False, message="No response", value=None)
+_RESP_TIMEOUT = _DriverBoardResponse(success=False, message="Timeout", value=None)
+_RESP_COMM_ERR = _DriverBoardResponse(success=False, message="Communication error", value=None)
+_RESP_JSON_PARSE_ERROR = _DriverBoardResponse(success=False, message="JSON parse error", value=None)
+_RESP_BATCH_OK = _DriverBoardResponse(success=True, message="OK", value=None)
+_RESP_BATCH_FAILED = _DriverBoardResponse(success=False, message="Failed", value=None)
+_RESP_BATCH_SKIPPED = _DriverBoardResponse(success=False, message="Skipped after an earlier failure in the batch", value=None)
+
+_BATCH_BEGIN_FRAME: bytes = _DriverBoardCommand(TMC2209Command.BATCH_BEGIN).to_bytes()
+_BATCH_COMMIT_FRAME: bytes = _DriverBoardCommand(TMC2209Command.BATCH_COMMIT).to_bytes()
+
+_API: tuple[tuple[str, TMC2209Command, int | str | None, str], ...] = (
+    ("disable", TMC2209Command.ENABLE, 0, "Disable the stepper driver"),
+    ("enable", TMC2209Command.ENABLE, 'enable', "Enable or disable the stepper driver"),
+    ("set_hardware_enable_pin", TMC2209Command.SET_HARDWARE_ENABLE_PIN, 'pin', "Set hardware enable pin"),
+    ("is_hardware_disabled", TMC2209Command.HARDWARE_DISABLED, None, "Check if hardware is disabled"),
+    ("enable_analog_current_scaling", TMC2209Command.ENABLE_ANALOG_CURRENT_SCALING, None, "Enable analog current scaling"),
+    ("disable_automatic_current_scaling", TMC2209Command.DISABLE_AUTOMATIC_CURRENT_SCALING, None, "Disable automatic current scaling"),
+    ("enable_automatic_current_scaling", TMC2209Command.ENABLE_AUTOMATIC_CURRENT_SCALING, None, "Enable automatic current scaling"),
+    ("enable_automatic_gradient_adaptation", TMC2209Command.ENABLE_AUTOMATIC_GRADIENT_ADAPTATION, None, "Enable automatic gradient adaptation"),
+    ("set_pwm_offset", TMC2209Command.SET_PWM_OFFSET, 'offset', "Set PWM offset (0-255)"),
+    ("set_pwm_gradient", TMC2209Command.SET_PWM_GRADIENT, 'gradient', "Set PWM gradient (0-255)"),
+    ("set_run_current", TMC2209Command.SET_RUN_CURRENT, 'current_percent', "Set run current percentage (0-100)"),
+    ("set_hold_current", TMC2209Command.SET_HOLD_CURRENT, 'current_percent', "Set hold current percentage (0-100)"),
+    ("set_standstill_mode", TMC2209Command.SET_STANDSTILL_MODE, 'mode', "Set standstill mode"),
+    ("set_stall_guard_threshold", TMC2209Command.SET_STALL_GUARD_THRESHOLD, 'threshold', "Set StallGuard threshold (0-255)"),
+    ("set_microsteps_per_step", TMC2209Command.SET_MICROSTEPS_PER_STEP, 'microsteps', "Set microsteps per step (must be power of 2)"),
+    ("set_microsteps_per_step_power_of_two", TMC2209Command.SET_MICROSTEPS_PER_STEP_POWER_OF_TWO, 'exponent', "Set microsteps per step using power of two exponent (0-6)"),
+    ("move_at_velocity", TMC2209Command.MOVE_AT_VELOCITY, 'velocity', "Move at specified velocity"),
+    ("stop_moving", TMC2209Command.MOVE_AT_VELOCITY, 0, "Stop moving"),
+    ("move_using_step_dir_interface", TMC2209Command.MOVE_USING_STEP_DIR_INTERFACE, None, "Switch to step/dir interface mode"),
+    ("is_setup_and_communicating", TMC2209Command.IS_SETUP_AND_COMMUNICATING, None, "Check if setup and communication is OK"),
+    ("set_reply_delay", TMC2209Command.SET_REPLY_DELAY, 'delay', "Set reply delay"),
+    ("get_stall_guard_result", TMC2209Command.GET_STALL_GUARD_RESULT, None, "Get StallGuard result"),
+    ("is_standing_still", TMC2209Command.IS_STANDING_STILL, None, "Check if motor is standing still"),
+    ("reset_to_safe_current", TMC2209Command.RESET_TO_SAFE_CURRENT, None, "Reset to safe current"),
+)
+"""
+Command methods generated on ArduinoStepper_TMC2209 as (name, command code, value, docstring).
+The value is the name of the method's single argument, a fixed value sent on every call, or None for commands without a value.
+Each entry also gets a name_async variant.
+"""
+
     
 class ArduinoStepper_TMC2209:
-    """Arduino TMC2209 Stepper Motor Driver Controller"""
-
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 2, logger: Optional[logging.Logger] = None):
-        self.port = port
-        self.baudrate = baudrate
-        self.timeout = timeout
-        self.serial_conn = None
-        self.__logger = self._setup_logger() if logger is None else logger
+    """
+    Arduino TMC2209 Stepper Motor Driver Controller
+
+    The baudrate must match Serial.begin() in the Arduino firmware, which runs at 500000 baud. The Uno's
+    16 MHz clock divides it exactly, and it spends about a quarter of the wire time of 115200 per command.
+    On Linux hosts a kernel built with CONFIG_HZ=1000 further shortens the wakeup latency when polling responses.
+
+    With binary_protocol=True commands and responses are sent as fixed size binary frames instead of
+    JSON lines. Responses then carry no message text. The firmware accepts both protocols.
+
+    With low_latency=True (the default) connect() turns on the serial driver's low latency mode, so short
+    responses are delivered right away instead of after the USB-serial chip's latency timer (16 ms on FTDI).
+    On Linux this sets ASYNC_LOW_LATENCY, the same as `setserial <port> low_latency`. Platforms without
+    support silently keep the default.
+
+    settle_delays maps command codes to a delay in seconds applied after a successful response, for commands
+    whose physical effect needs time to settle (e.g. a current change). No command is delayed by default.
+    Commands sent with send_many, send_batch, a pipeline or a batch are not delayed.
+
+    The command methods are generated from _API. Every command has an awaitable *_async variant.
+    Setters take their one argument positionally or as a keyword named after the _API entry, e.g. set_run_current(current_percent=50).
+    If a mux is given, the async variants are sent through that shared AsyncSerialMux and several instances may have commands in flight on the same link at once.
+    Otherwise they run the blocking call in a worker thread.
+
+    submit() writes a command tagged with a sequence number and returns a Future right away. A reader
+    thread resolves the futures as the responses arrive, and drain() waits for all of them and stops
+    the reader. Blocking command calls must not be issued between submit() and drain().
+
+    With threaded_reader=True the reader thread is started by connect() and runs until disconnect().
+    Every command, blocking or submitted, is then answered through it, so blocking calls and submit()
+    may be mixed freely and a response is parsed as soon as it arrives instead of when the caller reads.
+    """
+
+    def __init__(self, port: str, baudrate: int = 500000, timeout: float = 2, logger: Optional[logging.Logger] = None, binary_protocol: bool = False, mux: Optional['AsyncSerialMux'] = None, low_latency: bool = True, settle_delays: Optional[dict[TMC2209Command, float]] = None, threaded_reader: bool = False):
+        self.port: str = port
+        self.baudrate: int = baudrate
+        self.timeout: float = timeout
+        self.binary_protocol: bool = binary_protocol
+        self.low_latency: bool = low_latency
+        self.threaded_reader: bool = threaded_reader
+        self.serial_conn: Optional[serial.Serial] = None
+        self.__logger: logging.Logger = self._setup_logger() if logger is None else logger
+        self.__pending_commands: Optional[list[_DriverBoardCommand]] = None
+        self.__rx_buf: bytearray = bytearray()
+        self.__mux: Optional['AsyncSerialMux'] = mux
+        self.settle_delays: dict[TMC2209Command, float] = {} if settle_delays is None else dict(settle_delays)
+        self.__next_seq: int = 0
+        self.__in_flight: dict[int, tuple[Future, int]] = {}
+        self.__in_flight_bytes: int = 0
+        self.__submitted: list[tuple[int, Future]] = []
+        self.__window: threading.Condition = threading.Condition()
+        self.__reader_thread: Optional[threading.Thread] = None
+        self.__reader_stop: threading.Event = threading.Event()
 
     def _setup_logger(self) -> logging.Logger:
         """Setup default logger"""
+        global _log_listener
         logger = logging.getLogger('ArduinoStepper_TMC2209')
         logger.setLevel(logging.INFO)
         if not logger.handlers:
             handler = logging.StreamHandler()
             formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
             handler.setFormatter(formatter)
-            logger.addHandler(handler)
+
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            _log_listener = logging.handlers.QueueListener(log_queue, handler)
+            _log_listener.start()
+            atexit.register(_log_listener.stop)
         return logger
 
     def connect(self) -> bool:
@@ -114,132 +313,383 @@ class ArduinoStepper_TMC2209:
                 if not self.port.startswith('COM'):
                     self.__logger.warning("Windows detected but port doesn't start with COM: %s", self.port)
             
+            # 開啟前先拉低 DTR/RTS，避免 USB 轉序列晶片在開啟時觸發 Arduino 自動重置
             self.serial_conn = serial.Serial(
-                port=self.port,
                 baudrate=self.baudrate,
-                timeout=self.timeout
+                timeout=self.timeout,
+                inter_byte_timeout=0.01,
+                dsrdtr=False
             )
-            
-            # 等待 Arduino 初始化
-            time.sleep(2)
-            
+            self.serial_conn.port = self.port
+            self.serial_conn.dtr = False
+            self.serial_conn.rts = False
+            self.serial_conn.open()
+
+            # 關閉 USB 轉序列晶片的 16ms 延遲計時器，讓短回應立即送達
+            if self.low_latency:
+                try:
+                    self.serial_conn.set_low_latency_mode(True)
+                except (NotImplementedError, OSError, ValueError):
+                    pass
+
+            # Windows 預設的驅動緩衝區過小，加大以避免讀取時分段
+            if sys.platform.startswith('win'):
+                self.serial_conn.set_buffer_size(rx_size=65536, tx_size=4096)
+
             self.__logger.info("Connected to Arduino on %s at %d baud", self.port, self.baudrate)
-            
-            # 讀取 Arduino 的歡迎訊息
+
+            # 以握手取代固定等待 Arduino 初始化
             try:
-                response = self.serial_conn.readline().decode('utf-8').strip()
+                response = self._wait_until_ready()
                 if response:
                     self.__logger.info("Arduino response: %s", response)
+                else:
+                    self.__logger.warning("Arduino did not respond to the readiness handshake")
             except Exception as e:
                 self.__logger.warning("Could not read Arduino response: %s", e)
-            
+
+            if self.threaded_reader:
+                self.__start_reader()
+
             return True
         except serial.SerialException as e:
             self.__logger.error("Failed to connect to Arduino: %s", e)
             return False
 
+    def _wait_until_ready(self) -> bytes:
+        """
+        Send IS_SETUP_AND_COMMUNICATING until the first parseable JSON line arrives, either its response
+        or the greeting printed by a freshly reset Arduino. The handshake always uses JSON since
+        the firmware answers in the protocol of the command it received.
+        Returns the line, or an empty bytes object if the Arduino never answered.
+        """
+        self.__rx_buf.clear()
+        probe: bytes = _NO_VALUE_FRAMES[TMC2209Command.IS_SETUP_AND_COMMUNICATING]
+        for _ in range(_HANDSHAKE_ATTEMPTS):
+            self.serial_conn.write(probe)
+            self.serial_conn.flush()
+            line: bytes = self._readline_fast(_HANDSHAKE_POLL_S).strip()
+            if not line:
+                continue
+            try:
+                _json_loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            # 丟棄先前重試所產生、仍在傳輸中的回應
+            while self._readline_fast(_HANDSHAKE_POLL_S):
+                pass
+            self.serial_conn.reset_input_buffer()
+            self.__rx_buf.clear()
+            return line
+        return b""
+
     def disconnect(self) -> bool:
         """Disconnect from Arduino"""
+        self.__stop_reader()
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
             self.__logger.info("Disconnected from Arduino")
         return True
 
-    def disable(self) -> _DriverBoardResponse:
-        """Disable the stepper driver"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.ENABLE, 0))
-
-    def enable(self, enable: bool | int) -> _DriverBoardResponse:
-        """Enable or disable the stepper driver"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.ENABLE, int(enable)))
-
-    def set_hardware_enable_pin(self, pin: int) -> _DriverBoardResponse:
-        """Set hardware enable pin"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_HARDWARE_ENABLE_PIN, pin))
-
-    def is_hardware_disabled(self) -> _DriverBoardResponse:
-        """Check if hardware is disabled"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.HARDWARE_DISABLED))
-
-    def enable_analog_current_scaling(self) -> _DriverBoardResponse:
-        """Enable analog current scaling"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.ENABLE_ANALOG_CURRENT_SCALING))
-
-    def disable_automatic_current_scaling(self) -> _DriverBoardResponse:
-        """Disable automatic current scaling"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.DISABLE_AUTOMATIC_CURRENT_SCALING))
-
-    def enable_automatic_current_scaling(self) -> _DriverBoardResponse:
-        """Enable automatic current scaling"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.ENABLE_AUTOMATIC_CURRENT_SCALING))
-
-    def enable_automatic_gradient_adaptation(self) -> _DriverBoardResponse:
-        """Enable automatic gradient adaptation"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.ENABLE_AUTOMATIC_GRADIENT_ADAPTATION))
-
-    def set_pwm_offset(self, offset: int) -> _DriverBoardResponse:
-        """Set PWM offset (0-255)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_PWM_OFFSET, offset))
-
-    def set_pwm_gradient(self, gradient: int) -> _DriverBoardResponse:
-        """Set PWM gradient (0-255)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_PWM_GRADIENT, gradient))
-
-    def set_run_current(self, current_percent: int) -> _DriverBoardResponse:
-        """Set run current percentage (0-100)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_RUN_CURRENT, current_percent))
-
-    def set_hold_current(self, current_percent: int) -> _DriverBoardResponse:
-        """Set hold current percentage (0-100)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_HOLD_CURRENT, current_percent))
-
-    def set_standstill_mode(self, mode: StandstillMode) -> _DriverBoardResponse:
-        """Set standstill mode"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_STANDSTILL_MODE, int(mode)))
-
-    def set_stall_guard_threshold(self, threshold: int) -> _DriverBoardResponse:
-        """Set StallGuard threshold (0-255)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_STALL_GUARD_THRESHOLD, threshold))
-
-    def set_microsteps_per_step(self, microsteps: int) -> _DriverBoardResponse:
-        """Set microsteps per step (must be power of 2)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_MICROSTEPS_PER_STEP, microsteps))
-
-    def set_microsteps_per_step_power_of_two(self, exponent: int) -> _DriverBoardResponse:
-        """Set microsteps per step using power of two exponent (0-6)"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_MICROSTEPS_PER_STEP_POWER_OF_TWO, exponent))
-
-    def move_at_velocity(self, velocity: int) -> _DriverBoardResponse:
-        """Move at specified velocity"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.MOVE_AT_VELOCITY, velocity))
-
-    def stop_moving(self) -> _DriverBoardResponse:
-        """Stop moving"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.MOVE_AT_VELOCITY, 0))
-
-    def move_using_step_dir_interface(self) -> _DriverBoardResponse:
-        """Switch to step/dir interface mode"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.MOVE_USING_STEP_DIR_INTERFACE))
+    async def _send_command_async(self, command: _DriverBoardCommand) -> Optional[_DriverBoardResponse]:
+        """
+        Send command through the mux if one is set, otherwise run the blocking call in a worker thread.
+        Returns None if the command is queued in an open pipeline.
+        """
+        if self.__mux is None:
+            return await asyncio.to_thread(self._txrx, command)
+
+        response: _DriverBoardResponse = await self.__mux.send_command(command)
+        delay: Optional[float] = self.settle_delays.get(command.command_code)
+        if delay and response.success:
+            await asyncio.sleep(delay)
+        return response
+
+    @contextmanager
+    def pipeline(self) -> Iterator[list[_DriverBoardResponse]]:
+        """
+        Queue the commands issued inside the context and send them together with send_many on exit.
+        The command methods return None while the pipeline is open. The yielded list is filled with
+        the responses, in the order the commands were issued, when the context exits.
+        """
+        with self.__queue_commands(self.send_many) as responses:
+            yield responses
+
+    @contextmanager
+    def batch(self) -> Iterator[list[_DriverBoardResponse]]:
+        """
+        Like pipeline(), but the queued commands are sent with send_batch on exit, so every
+        _BATCH_CAPACITY commands cost a single round trip.
+        """
+        with self.__queue_commands(self.send_batch) as responses:
+            yield responses
+
+    @contextmanager
+    def __queue_commands(self, send) -> Iterator[list[_DriverBoardResponse]]:
+        """Collect the commands issued inside the context and send them with send on exit"""
+        if self.__pending_commands is not None:
+            raise RuntimeError("A pipeline is already open")
+
+        responses: list[_DriverBoardResponse] = []
+        self.__pending_commands = []
+        try:
+            yield responses
+        finally:
+            commands, self.__pending_commands = self.__pending_commands, None
+
+        responses.extend(send(commands))
+
+    def send_many(self, commands: list[_DriverBoardCommand]) -> list[_DriverBoardResponse]:
+        """
+        Send several commands and receive their responses in order.
+        Commands are written in as few writes as possible so the Arduino parses the next command
+        while the host is still reading the previous response. The unanswered bytes on the wire are
+        kept below the Arduino receive buffer size to avoid overruns.
+        """
+        if not commands:
+            return []
 
-    def is_setup_and_communicating(self) -> _DriverBoardResponse:
-        """Check if setup and communication is OK"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.IS_SETUP_AND_COMMUNICATING))
+        if not self.serial_conn or not self.serial_conn.is_open:
+            self.__logger.error("Not connected to Arduino")
+            return [_RESP_COMM_ERR] * len(commands)
+
+        if self.threaded_reader:
+            submitted: list[tuple[int, Future]] = [self.__submit(command) for command in commands]
+            responses = [self.__await_submitted(seq, future) for seq, future in submitted]
+            for command, response in zip(commands, responses):
+                if not response.success:
+                    self.__logger.error("Receive response error after sending command %s: %s", command.command_code, response.message)
+            return responses
+
+        frames: list[bytes] = [self._encode_command(command) for command in commands]
+        responses: list[_DriverBoardResponse] = []
+        in_flight: deque[int] = deque()
+        in_flight_bytes: int = 0
+        next_frame: int = 0
+
+        while len(responses) < len(frames):
+            payload: bytearray = bytearray()
+            while next_frame < len(frames):
+                frame = frames[next_frame]
+                if in_flight and in_flight_bytes + len(frame) > _ARDUINO_RX_BUFFER_SIZE:
+                    break
+                payload += frame
+                in_flight.append(len(frame))
+                in_flight_bytes += len(frame)
+                next_frame += 1
+
+            if payload:
+                if self.__logger.isEnabledFor(logging.DEBUG):
+                    self.__logger.debug("Sending commands: %s", payload)
+                try:
+                    self.serial_conn.write(payload)
+                    self.serial_conn.flush()
+                except serial.SerialException as e:
+                    self.__logger.error("Error sending commands: %s", e)
+                    responses.extend([_RESP_COMM_ERR] * (len(frames) - len(responses)))
+                    return responses
+
+            command = commands[len(responses)]
+            response = self._receive_response()
+            if not response.success:
+                self.__logger.error("Receive response error after sending command %s: %s", command.command_code, response.message)
+            responses.append(response)
+            in_flight_bytes -= in_flight.popleft()
+
+        return responses
+
+    def send_batch(self, commands: list[_DriverBoardCommand]) -> list[_DriverBoardResponse]:
+        """
+        Send commands as firmware batches of up to _BATCH_CAPACITY commands.
+        The firmware queues the commands between BATCH_BEGIN and BATCH_COMMIT, runs them in order on
+        commit and answers only the commit, so each batch is one write and one response. A batch stops
+        at its first failed command, and the commands after it, in later batches too, are not sent.
+        Batches always use binary frames, so the responses carry neither message text nor the command's
+        value; query commands should be sent individually.
+        The threaded reader only parses JSON lines, so with threaded_reader=True this falls back to send_many.
+        """
+        if not commands:
+            return []
 
-    def set_reply_delay(self, delay: int) -> _DriverBoardResponse:
-        """Set reply delay"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.SET_REPLY_DELAY, delay))
+        if not self.serial_conn or not self.serial_conn.is_open:
+            self.__logger.error("Not connected to Arduino")
+            return [_RESP_COMM_ERR] * len(commands)
 
-    def get_stall_guard_result(self) -> _DriverBoardResponse:
-        """Get StallGuard result"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.GET_STALL_GUARD_RESULT))
+        if self.threaded_reader:
+            return self.send_many(commands)
 
-    def is_standing_still(self) -> _DriverBoardResponse:
-        """Check if motor is standing still"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.IS_STANDING_STILL))
+        responses: list[_DriverBoardResponse] = []
+        for start in range(0, len(commands), _BATCH_CAPACITY):
+            chunk: list[_DriverBoardCommand] = commands[start:start + _BATCH_CAPACITY]
+            payload: bytes = b"".join([_BATCH_BEGIN_FRAME, *[command.to_bytes() for command in chunk], _BATCH_COMMIT_FRAME])
+            if self.__logger.isEnabledFor(logging.DEBUG):
+                self.__logger.debug("Sending batch: %s", payload)
+            try:
+                self.serial_conn.write(payload)
+                self.serial_conn.flush()
+            except serial.SerialException as e:
+                self.__logger.error("Error sending batch: %s", e)
+                responses.extend([_RESP_COMM_ERR] * (len(commands) - len(responses)))
+                return responses
+
+            commit: _DriverBoardResponse = self.__receive_binary_response()
+            if commit.value is None:
+                self.__logger.error("No response to batch commit")
+                responses.extend([commit] * (len(commands) - len(responses)))
+                return responses
+
+            responses.extend([_RESP_BATCH_OK] * commit.value)
+            if not commit.success:
+                # commit.value 為失敗命令之前成功執行的命令數
+                if commit.value < len(chunk):
+                    self.__logger.error("Batch stopped at command %s", chunk[commit.value].command_code)
+                    responses.append(_RESP_BATCH_FAILED)
+                else:
+                    self.__logger.error("Batch rejected by the firmware")
+                responses.extend([_RESP_BATCH_SKIPPED] * (len(commands) - len(responses)))
+                return responses
+
+        return responses
+
+    def submit(self, command: _DriverBoardCommand) -> 'Future[_DriverBoardResponse]':
+        """
+        Write command tagged with a sequence number without waiting for its response.
+        Blocks only while the unanswered bytes on the wire would overflow the Arduino receive buffer.
+        Submitted commands are always sent as JSON, since binary frames carry no sequence number.
+        """
+        seq, future = self.__submit(command)
+        with self.__window:
+            self.__submitted.append((seq, future))
+        return future
+
+    def __submit(self, command: _DriverBoardCommand) -> tuple[int, 'Future[_DriverBoardResponse]']:
+        """Write command with a new seq and register its future. Returns seq -1 with a completed future on failure."""
+        future: Future[_DriverBoardResponse] = Future()
+        conn: Optional[serial.Serial] = self.serial_conn
+        if conn is None or not conn.is_open:
+            self.__logger.error("Not connected to Arduino")
+            future.set_result(_RESP_COMM_ERR)
+            return -1, future
+
+        self.__start_reader()
+        with self.__window:
+            seq: int = self.__next_seq
+            self.__next_seq = (seq + 1) % _SEQ_MODULO
+            frame: bytes = (replace(command, seq=seq).to_json() + '\n').encode('utf-8')
+            if not self.__window.wait_for(
+                    lambda: not self.__in_flight or self.__in_flight_bytes + len(frame) <= _ARDUINO_RX_BUFFER_SIZE,
+                    self.timeout):
+                future.set_result(_RESP_TIMEOUT)
+                return -1, future
+            self.__in_flight[seq] = (future, len(frame))
+            self.__in_flight_bytes += len(frame)
+
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("Submitting command: %s", frame)
+        try:
+            conn.write(frame)
+            conn.flush()
+        except serial.SerialException as e:
+            self.__logger.error("Error sending command: %s", e)
+            self.__resolve(seq, _RESP_COMM_ERR)
+        return seq, future
 
-    def reset_to_safe_current(self) -> _DriverBoardResponse:
-        """Reset to safe current"""
-        return self._send_command_and_receive_response(_DriverBoardCommand(TMC2209Command.RESET_TO_SAFE_CURRENT))
+    def __await_submitted(self, seq: int, future: 'Future[_DriverBoardResponse]') -> _DriverBoardResponse:
+        """Wait up to the serial timeout for a submitted command, resolving it as Timeout if no response arrives"""
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            self.__logger.error("Timeout waiting for response to submitted command with seq %d", seq)
+            self.__resolve(seq, _RESP_TIMEOUT)
+            return future.result()
+
+    def drain(self) -> list[_DriverBoardResponse]:
+        """
+        Wait for the responses of all submitted commands, then stop the reader thread.
+        Returns the responses in submission order. Commands left unanswered for the serial timeout get a Timeout response.
+        """
+        with self.__window:
+            submitted, self.__submitted = self.__submitted, []
+
+        responses: list[_DriverBoardResponse] = [self.__await_submitted(seq, future) for seq, future in submitted]
+
+        if not self.threaded_reader:
+            self.__stop_reader()
+        return responses
+
+    def __resolve(self, seq: int, response: _DriverBoardResponse) -> None:
+        """Release the window space of a submitted command and complete its future"""
+        with self.__window:
+            entry: Optional[tuple[Future, int]] = self.__in_flight.pop(seq, None)
+            if entry is None:
+                return
+            self.__in_flight_bytes -= entry[1]
+            self.__window.notify_all()
+        if not entry[0].done():
+            entry[0].set_result(response)
+
+    def __start_reader(self) -> None:
+        if self.__reader_thread is not None and self.__reader_thread.is_alive():
+            return
+        self.__reader_stop.clear()
+        self.__reader_thread = threading.Thread(target=self.__reader_loop, name=f"ArduinoStepper_TMC2209 reader {self.port}", daemon=True)
+        self.__reader_thread.start()
+
+    def __stop_reader(self) -> None:
+        if self.__reader_thread is None:
+            return
+        self.__reader_stop.set()
+        # 讓阻塞中的 read 立即返回，而非等到逾時
+        if hasattr(self.serial_conn, 'cancel_read'):
+            self.serial_conn.cancel_read()
+        self.__reader_thread.join()
+        self.__reader_thread = None
+
+    def __reader_loop(self) -> None:
+        """Read response lines and resolve the submitted command with the matching seq"""
+        while not self.__reader_stop.is_set():
+            try:
+                line: bytes = self.__readline_blocking().strip()
+            except serial.SerialException as e:
+                self.__logger.error("Error receiving response: %s", e)
+                return
+            if not line or self.__reader_stop.is_set():
+                continue
+
+            response: _DriverBoardResponse = _DriverBoardResponse.from_json(line)
+            if response.seq is None:
+                self.__logger.warning("Dropping response without seq: %s", line)
+                continue
+            self.__resolve(response.seq, response)
+
+    def __readline_blocking(self) -> bytes:
+        """
+        Read one line for the reader thread. Blocks in a single read for the first byte, then takes
+        everything already waiting in one call instead of polling.
+        Returns an empty bytes object on read timeout or cancel_read.
+        """
+        conn: serial.Serial = self.serial_conn
+        buf: bytearray = self.__rx_buf
+        while True:
+            newline: int = buf.find(b"\n")
+            if newline >= 0:
+                line: bytes = bytes(memoryview(buf)[:newline])
+                del buf[:newline + 1]
+                return line
+
+            chunk: bytes = conn.read(conn.in_waiting or 1)
+            if not chunk:
+                return b""
+            buf += chunk
+
+    def _encode_command(self, command: _DriverBoardCommand) -> bytes:
+        """Encode a command with the protocol selected in the constructor"""
+        if self.binary_protocol:
+            return command.to_bytes()
+        if command.value is None:
+            return _NO_VALUE_FRAMES[command.command_code]
+        return (command.to_json() + '\n').encode('utf-8')
 
     def _send_command(self, command: _DriverBoardCommand) -> bool:
         """Send command to Arduino and receive response"""
@@ -248,11 +698,12 @@ class ArduinoStepper_TMC2209:
             return False
 
         # Send command
-        command_json = command.to_json()
-        self.__logger.debug("Sending command: %s", command_json)
+        payload: bytes = self._encode_command(command)
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("Sending command: %s", payload)
 
         try:
-            self.serial_conn.write((command_json + '\n').encode('utf-8'))
+            self.serial_conn.write(payload)
             self.serial_conn.flush()
             return True
 
@@ -263,35 +714,145 @@ class ArduinoStepper_TMC2209:
     def _receive_response(self) -> _DriverBoardResponse:
         """Receive response from Arduino"""
 
-        response_line: str | None = None
+        if self.binary_protocol:
+            return self.__receive_binary_response()
+
         try:
-            # Read response
-            response_line = self.serial_conn.readline().decode('utf-8').strip()
+            # Read response. Both orjson and json parse bytes directly, so the line is not decoded
+            response_line: bytes = self._readline_fast().strip()
 
             if response_line:
-                self.__logger.debug("Received response: %s", response_line)
-                return _DriverBoardResponse.from_json(response_line)
+                if self.__logger.isEnabledFor(logging.DEBUG):
+                    self.__logger.debug("Received response: %s", response_line)
+                # from_json 自行處理解析錯誤並回傳共用的 _RESP_JSON_PARSE_ERROR，不會拋出例外
+                response: _DriverBoardResponse = _DriverBoardResponse.from_json(response_line)
+                if response is _RESP_JSON_PARSE_ERROR:
+                    self.__logger.error("Cannot decode response: %s", response_line)
+                return response
 
-            return _DriverBoardResponse(success=False, message="No response", value=None)
+            return _RESP_NO_RESPONSE
 
         except serial.SerialTimeoutException as e:
             self.__logger.error("Timeout receiving response: %s", e)
-            return _DriverBoardResponse(success=False, message="Timeout", value=None)
+            return _RESP_TIMEOUT
+
+    def __receive_binary_response(self) -> _DriverBoardResponse:
+        """Receive one fixed size binary response frame"""
+        frame: bytes = self.serial_conn.read(_BINARY_RESPONSE_SIZE)
+        if len(frame) < _BINARY_RESPONSE_SIZE:
+            return _RESP_NO_RESPONSE
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("Received response: %s", frame)
+        return _DriverBoardResponse.from_bytes(frame)
+
+    def _readline_fast(self, deadline_s: Optional[float] = None) -> bytes:
+        """
+        Read one line without the trailing newline by polling in_waiting, so the line is returned as
+        soon as its newline arrives instead of waiting on the driver's read timeout.
+        Bytes are accumulated in a receive buffer reused across calls, and bytes received after the
+        newline stay in it for the next call.
+        Returns an empty bytes object if no complete line arrives within deadline_s, which defaults to the serial timeout.
+        """
+        buf: bytearray = self.__rx_buf
+        searched: int = 0
+        start: float = time.monotonic()
+        end: float = start + (self.timeout if deadline_s is None else deadline_s)
+
+        while True:
+            newline: int = buf.find(b"\n", searched)
+            if newline >= 0:
+                line = bytes(memoryview(buf)[:newline])
+                del buf[:newline + 1]
+                return line
+            searched = len(buf)
+
+            now = time.monotonic()
+            if now >= end:
+                return b""
+
+            waiting: int = self.serial_conn.in_waiting
+            if waiting:
+                buf += self.serial_conn.read(waiting)
+            elif now - start > _BUSY_POLL_S:
+                time.sleep(_IDLE_POLL_S)
+
+    def _txrx(self, command: _DriverBoardCommand) -> Optional[_DriverBoardResponse]:
+        """
+        Send command and receive response in one call, checking the connection only once.
+        Returns None if the command is queued in an open pipeline.
+        """
+        if self.__pending_commands is not None:
+            self.__pending_commands.append(command)
+            return None
+
+        conn: Optional[serial.Serial] = self.serial_conn
+        logger: logging.Logger = self.__logger
+        if conn is None or not conn.is_open:
+            logger.error("Not connected to Arduino")
+            logger.error("Command failed when sending command %s", command.command_code)
+            return _RESP_COMM_ERR
+
+        response: _DriverBoardResponse
+        if self.threaded_reader:
+            response = self.__await_submitted(*self.__submit(command))
+        else:
+            payload: bytes = self._encode_command(command)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sending command: %s", payload)
+            try:
+                conn.write(payload)
+                conn.flush()
+            except serial.SerialException as e:
+                logger.error("Error sending command: %s", e)
+                logger.error("Command failed when sending command %s", command.command_code)
+                return _RESP_COMM_ERR
+
+            response = self._receive_response()
+        if not response.success:
+            logger.error("Receive response error after sending command %s: %s", command.command_code, response.message)
+            return response
 
-        except json.JSONDecodeError as e:
-            self.__logger.error("Error decoding response: %s", e)
-            return _DriverBoardResponse(success = False, message = f"Cannot decode response: {response_line}", value = None)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received response after sending command %s: %s", command.command_code, response.message)
 
-    def _send_command_and_receive_response(self, command: _DriverBoardCommand) -> _DriverBoardResponse:
-        """Send command and receive response"""
-        if not self._send_command(command):
-            self.__logger.error("Command failed when sending command %s", command.command_code)
-            return _DriverBoardResponse(success=False, message="Communication error", value=None)
+        delay: Optional[float] = self.settle_delays.get(command.command_code)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    # 舊名稱保留為別名，維持 API 相容
+    _send_command_and_receive_response = _txrx
+
+
+def _make_command_methods(command_code: TMC2209Command, value: int | str | None):
+    """Build the blocking and async method for one _API entry"""
+    if isinstance(value, str):
+        def method(self: ArduinoStepper_TMC2209, value: int) -> Optional[_DriverBoardResponse]:
+            return self._txrx(_DriverBoardCommand(command_code, value))
+
+        async def method_async(self: ArduinoStepper_TMC2209, value: int) -> Optional[_DriverBoardResponse]:
+            return await self._send_command_async(_DriverBoardCommand(command_code, value))
+
+        # 將參數 value 改名為 _API 中的名稱，呼叫端可用該名稱以關鍵字傳入，且呼叫時沒有額外的參數綁定成本
+        for function in (method, method_async):
+            function.__code__ = function.__code__.replace(co_varnames=("self", value))
+            function.__annotations__ = {value if key == "value" else key: annotation for key, annotation in function.__annotations__.items()}
+    else:
+        # 命令內容固定，dataclass 為 frozen，因此每次呼叫共用同一個命令物件
+        command = _DriverBoardCommand(command_code, value)
+
+        def method(self: ArduinoStepper_TMC2209) -> Optional[_DriverBoardResponse]:
+            return self._txrx(command)
+
+        async def method_async(self: ArduinoStepper_TMC2209) -> Optional[_DriverBoardResponse]:
+            return await self._send_command_async(command)
+    return method, method_async
 
-        response: _DriverBoardResponse = self._receive_response()
-        if not response.success:
-            self.__logger.error("Receive response error after sending command %s: %s", command.command_code, response.message)
-            return response
 
-        self.__logger.debug("Received response after sending command %s: %s", command.command_code, response.message)
-        return response
\ No newline at end of file
+for _name, _command_code, _value, _doc in _API:
+    for _method, _method_name in zip(_make_command_methods(_command_code, _value), (_name, f"{_name}_async")):
+        _method.__name__ = _method_name
+        _method.__qualname__ = f"ArduinoStepper_TMC2209.{_method_name}"
+        _method.__doc__ = _doc
+        setattr(ArduinoStepper_TMC2209, _method_name, _method)
+del _name, _command_code, _value, _doc, _method, _method_name
\ No newline at end of file
@@ -0,0 +1,125 @@
+import asyncio
+import dataclasses
+import logging
+import serial
+from typing import Optional
+
+from dep.arduinounostepper_TMC2209.ArduinoStepper_TMC2209 import _ARDUINO_RX_BUFFER_SIZE, _RESP_COMM_ERR, _RESP_TIMEOUT, _SEQ_MODULO, _DriverBoardCommand, _DriverBoardResponse
+
+
+class AsyncSerialMux:
+    """
+    Share one serial.Serial between several ArduinoStepper_TMC2209 instances
+
+    Every command is tagged with a "Seq" number that the firmware echoes back as "seq", so several
+    commands can be in flight at once and each response is routed to the coroutine awaiting it.
+    The unanswered bytes on the wire are kept below the Arduino receive buffer size.
+    Commands are always sent as JSON since binary frames carry no sequence number.
+    Error responses echo the seq too, except the "JSON error" for a line the firmware could not parse: that
+    response carries no seq, is dropped here, and the command waiting for it returns _RESP_TIMEOUT after timeout.
+
+    Usage:
+        async with AsyncSerialMux(serial_conn) as mux:
+            stepper = ArduinoStepper_TMC2209(port, mux = mux)
+            await stepper.is_setup_and_communicating_async()
+    """
+
+    def __init__(self, serial_conn: serial.Serial, timeout: float = 2, logger: Optional[logging.Logger] = None):
+        self.timeout: float = timeout
+        self.__serial_conn: serial.Serial = serial_conn
+        self.__logger: logging.Logger = logging.getLogger('AsyncSerialMux') if logger is None else logger
+        self.__pending: dict[int, asyncio.Future[_DriverBoardResponse]] = {}
+        self.__next_seq: int = 0
+        self.__in_flight_bytes: int = 0
+        self.__in_flight_changed: Optional[asyncio.Condition] = None
+        self.__reader_task: Optional[asyncio.Task] = None
+        self.__stopping: bool = False
+
+    async def __aenter__(self) -> 'AsyncSerialMux':
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.stop()
+
+    def start(self) -> None:
+        """Start the reader task on the running event loop"""
+        if self.__reader_task is not None:
+            return
+        self.__in_flight_changed = asyncio.Condition()
+        self.__stopping = False
+        self.__reader_task = asyncio.create_task(self.__read_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop the reader task and fail the commands still waiting for a response.
+        Returns once the reader thread has left readline, so the serial port can be read directly again.
+        """
+        if self.__reader_task is None:
+            return
+        # 讓背景執行緒中的 readline 立即返回，而非等到逾時
+        self.__stopping = True
+        if hasattr(self.__serial_conn, 'cancel_read'):
+            self.__serial_conn.cancel_read()
+        await self.__reader_task
+        self.__reader_task = None
+
+        for future in self.__pending.values():
+            if not future.done():
+                future.set_result(_RESP_COMM_ERR)
+        self.__pending.clear()
+
+    async def send_command(self, command: _DriverBoardCommand) -> _DriverBoardResponse:
+        """Send command tagged with a new sequence number and wait for the response carrying the same number"""
+        if self.__reader_task is None:
+            raise RuntimeError("AsyncSerialMux is not started")
+
+        seq: int = self.__next_seq
+        self.__next_seq = (seq + 1) % _SEQ_MODULO
+        frame: bytes = (dataclasses.replace(command, seq=seq).to_json() + '\n').encode('utf-8')
+        future: asyncio.Future[_DriverBoardResponse] = asyncio.get_running_loop().create_future()
+        self.__pending[seq] = future
+
+        try:
+            async with self.__in_flight_changed:
+                await self.__in_flight_changed.wait_for(
+                    lambda: self.__in_flight_bytes == 0 or self.__in_flight_bytes + len(frame) <= _ARDUINO_RX_BUFFER_SIZE)
+                self.__in_flight_bytes += len(frame)
+
+            try:
+                if self.__logger.isEnabledFor(logging.DEBUG):
+                    self.__logger.debug("Sending command: %s", frame)
+                self.__serial_conn.write(frame)
+                self.__serial_conn.flush()
+                return await asyncio.wait_for(future, self.timeout)
+            except serial.SerialException as e:
+                self.__logger.error("Error sending command: %s", e)
+                return _RESP_COMM_ERR
+            except asyncio.TimeoutError:
+                self.__logger.error("Timeout waiting for response to command %s", command.command_code)
+                return _RESP_TIMEOUT
+            finally:
+                async with self.__in_flight_changed:
+                    self.__in_flight_bytes -= len(frame)
+                    self.__in_flight_changed.notify_all()
+        finally:
+            self.__pending.pop(seq, None)
+
+    async def __read_loop(self) -> None:
+        """Read response lines in a worker thread and resolve the future matching each seq"""
+        while not self.__stopping:
+            try:
+                line: bytes = (await asyncio.to_thread(self.__serial_conn.readline)).strip()
+            except serial.SerialException as e:
+                self.__logger.error("Error receiving response: %s", e)
+                await asyncio.sleep(self.timeout)
+                continue
+            if not line or self.__stopping:
+                continue
+
+            response = _DriverBoardResponse.from_json(line)
+            future = self.__pending.get(response.seq) if response.seq is not None else None
+            if future is None or future.done():
+                self.__logger.warning("Dropping response without a waiting command: %s", line)
+                continue
+            future.set_result(response)
\ No newline at end of file
@@ -5,9 +5,21 @@
 TMC2209 stepper;
 bool motorMoving = false;
 
-#define INPUT_BUFFER_SIZE 56
+#define INPUT_BUFFER_SIZE 64
 #define OUTPUT_BUFFER_SIZE 192
 
+// JSON 命令可附帶 "Seq"，回應會以 "seq" 原樣帶回，讓主機端依序號分派回應；未附帶時回應不含 "seq"
+#define NO_SEQ -1
+
+// 二進位命令框：[0xA5][CommandCode:uint8][Value:int32 little endian，僅限需要數值的命令]
+// 二進位回應框：[success:uint8][value:int32 little endian]
+#define BINARY_FRAME_MARKER 0xA5
+
+// 批次命令：BATCH_BEGIN 與 BATCH_COMMIT 之間的二進位命令只排入佇列、不回應，
+// 收到 BATCH_COMMIT 後依序執行，遇到第一個失敗即停止，並只回應一次 [success][已成功執行的命令數]。
+// 8 個帶數值的命令框加上 BEGIN/COMMIT 共 52 bytes，整批可放入 64 bytes 的接收緩衝區
+#define BATCH_CAPACITY 8
+
 SoftwareSerial driverSerial(UNO_RX_PIN, UNO_TX_PIN);
 
 // 定義命令代碼枚舉
@@ -34,11 +46,25 @@ enum CommandCode {
   CMD_GET_STALL_GUARD_RESULT = 19,
   CMD_IS_STANDING_STILL = 20,
   CMD_SENSORLESS_HOMING = 21,
-  CMD_RESET_TO_SAFE_CURRENT = 22
+  CMD_RESET_TO_SAFE_CURRENT = 22,
+  CMD_BATCH_BEGIN = 23,
+  CMD_BATCH_COMMIT = 24
 };
 
+struct QueuedCommand {
+  uint8_t commandCode;
+  bool hasValue;
+  int32_t value;
+};
+
+QueuedCommand batchQueue[BATCH_CAPACITY];
+uint8_t batchLength = 0;
+bool batchOpen = false;
+bool batchOverflowed = false;
+
 void setup() {
-  Serial.begin(115200);
+  // 16MHz / (8 * 500000) 為整數，倍速模式下沒有鮑率誤差；主機端的 ArduinoStepper_TMC2209 預設使用相同鮑率
+  Serial.begin(500000);
   while (!Serial) {
     ;  // 等待串口連接
   }
@@ -54,11 +80,17 @@ void setup() {
   // 設定安全的電流值，防止馬達過熱
   resetToSafeCurrentSettings();
 
-  sendResponse("Ready.", true, 0);
+  sendResponse("Ready.", true, 0, NO_SEQ);
 }
 
 void loop() {
   if (Serial.available()) {
+    // JSON 命令以 '{' 開頭，二進位命令以 BINARY_FRAME_MARKER 開頭
+    if (Serial.peek() == BINARY_FRAME_MARKER) {
+      processBinaryCommand();
+      return;
+    }
+
     const String input = Serial.readStringUntil('\n');
     input.trim();
 
@@ -68,30 +100,126 @@ void loop() {
   }
 }
 
+void processBinaryCommand() {
+  Serial.read();  // 丟棄 BINARY_FRAME_MARKER
+
+  uint8_t commandCode = 0;
+  if (Serial.readBytes(&commandCode, 1) != 1)
+    return;
+
+  int32_t value = 0;
+  const bool hasValue = commandHasValue(commandCode);
+  if (hasValue && Serial.readBytes((uint8_t*)&value, sizeof(value)) != sizeof(value)) {
+    sendBinaryResponse(false, 0);
+    return;
+  }
+
+  if (commandCode == CMD_BATCH_BEGIN) {
+    batchOpen = true;
+    batchLength = 0;
+    batchOverflowed = false;
+    return;
+  }
+  if (commandCode == CMD_BATCH_COMMIT) {
+    commitBatch();
+    return;
+  }
+  if (batchOpen) {
+    if (batchLength < BATCH_CAPACITY)
+      batchQueue[batchLength++] = { commandCode, hasValue, value };
+    else
+      batchOverflowed = true;
+    return;
+  }
+
+  int32_t out_value = -1;
+  char out_message[OUTPUT_BUFFER_SIZE] = { 0 };
+  bool success = executeIntCommand(commandCode, hasValue, value, out_value, out_message);
+  sendBinaryResponse(success, out_value);
+}
+
+void commitBatch() {
+  // 佇列溢位時整批不執行，避免只執行前半段
+  int32_t executed = 0;
+  bool success = !batchOverflowed;
+  if (success) {
+    int32_t out_value = -1;
+    char out_message[OUTPUT_BUFFER_SIZE] = { 0 };
+    for (uint8_t i = 0; i < batchLength; ++i) {
+      const QueuedCommand& command = batchQueue[i];
+      if (!executeIntCommand(command.commandCode, command.hasValue, command.value, out_value, out_message)) {
+        success = false;
+        break;
+      }
+      ++executed;
+    }
+  }
+
+  batchOpen = false;
+  batchLength = 0;
+  batchOverflowed = false;
+  sendBinaryResponse(success, executed);
+}
+
+bool commandHasValue(uint8_t commandCode) {
+  switch (commandCode) {
+    case CMD_ENABLE:
+    case CMD_SET_HARDWARE_ENABLE_PIN:
+    case CMD_SET_PWM_OFFSET:
+    case CMD_SET_PWM_GRADIENT:
+    case CMD_SET_RUN_CURRENT:
+    case CMD_SET_HOLD_CURRENT:
+    case CMD_SET_STANDSTILL_MODE:
+    case CMD_SET_STALL_GUARD_THRESHOLD:
+    case CMD_SET_MICROSTEPS_PER_STEP:
+    case CMD_SET_MICROSTEPS_PER_STEP_POWER_OF_TWO:
+    case CMD_MOVE_AT_VELOCITY:
+    case CMD_SET_REPLY_DELAY:
+    case CMD_SENSORLESS_HOMING:
+      return true;
+    default:
+      return false;
+  }
+}
+
+bool executeIntCommand(int32_t commandCode, bool hasValue, int32_t value, int32_t& out_value, char* out_message) {
+  // 將整數包裝成 JsonVariant，沿用 JSON 命令的處理流程
+  StaticJsonDocument<16> valueDoc;
+  if (hasValue)
+    valueDoc.set(value);
+  return executeCommand(commandCode, valueDoc.as<JsonVariant>(), out_value, out_message);
+}
+
 void processCommand(const char* jsonInput) {
 
   int32_t commandCode{ -1 };
+  int32_t seq{ NO_SEQ };
   JsonVariant commandValue;
-  if (!parseCommand(jsonInput, commandCode, commandValue))
+  if (!parseCommand(jsonInput, commandCode, commandValue, seq))
     return;
 
   int32_t out_value = -1;
   char out_message[OUTPUT_BUFFER_SIZE] = { 0 };
   bool success = executeCommand(commandCode, commandValue, out_value, out_message);
-  sendResponse(out_message, success, out_value);
+  sendResponse(out_message, success, out_value, seq);
 }
 
-bool parseCommand(const char* jsonInput, int32_t& out_commandCode, JsonVariant& out_value) {
+bool parseCommand(const char* jsonInput, int32_t& out_commandCode, JsonVariant& out_value, int32_t& out_seq) {
   StaticJsonDocument<INPUT_BUFFER_SIZE> doc;
   DeserializationError error = deserializeJson(doc, jsonInput);
 
   if (error) {
-    sendErrorResponse("JSON error");
+    // 無法解析時讀不到 Seq，回應不含 seq，主機端只能等到逾時
+    sendErrorResponse("JSON error", NO_SEQ);
     return false;
   }
 
+  // 先讀取 Seq，錯誤回應也帶回序號，主機端才能立即分派給等待中的命令
+  if (doc.containsKey("Seq"))
+    out_seq = doc["Seq"].as<int32_t>();
+
   if (!doc.containsKey("CommandCode")) {
-    sendErrorResponse("Missing CommandCode");
+    sendErrorResponse("Missing CommandCode", out_seq);
     return false;
   }
 
@@ -425,11 +553,13 @@ bool isPowerOfTwo(int n) {
   return n > 0 && (n & (n - 1)) == 0;
 }
 
-void sendResponse(const char* message, const bool& success, const int32_t& value) {
+void sendResponse(const char* message, const bool& success, const int32_t& value, const int32_t& seq) {
   StaticJsonDocument<OUTPUT_BUFFER_SIZE> response;
   response["success"] = success;
   response["message"] = message;
   response["value"] = value;
+  if (seq != NO_SEQ)
+    response["seq"] = seq;
 
   char jsonBuffer[OUTPUT_BUFFER_SIZE];  // 相應減少緩衝區大小
   size_t len = serializeJson(response, jsonBuffer, sizeof(jsonBuffer));
@@ -442,8 +572,13 @@ void sendResponse(const char* message, const bool& success, const int32_t& value
   Serial.println(jsonBuffer);
 }
 
-void sendErrorResponse(const char* errorMessage) {
-  sendResponse(errorMessage, false, 0);
+void sendBinaryResponse(const bool success, const int32_t value) {
+  Serial.write((uint8_t)(success ? 1 : 0));
+  Serial.write((const uint8_t*)&value, sizeof(value));
+}
+
+void sendErrorResponse(const char* errorMessage, const int32_t& seq) {
+  sendResponse(errorMessage, false, 0, seq);
 }
 
 void resetToSafeCurrentSettings() {
@@ -5,17 +5,27 @@ Tests TMC2209 stepper motor driver functionality through serial communication
 """
 
 import time
+import queue
+import atexit
+import asyncio
 import logging
+import logging.handlers
 import argparse
 import serial.tools.list_ports
 from typing import Literal
 from shared.LoggingFormatter import ColoredLoggingFormatter
 from dep.arduinounostepper_TMC2209.ArduinoStepper_TMC2209 import ArduinoStepper_TMC2209, StandstillMode
+from dep.arduinounostepper_TMC2209.AsyncSerialMux import AsyncSerialMux
 
 class ArduinoTMC2209Tester:
     """Test class for Arduino TMC2209 functionality"""
+
+    _FORMATTER: logging.Formatter = ColoredLoggingFormatter.instance()
+    # 所有測試 logger 共用同一個佇列，由背景執行緒寫到終端機，命令收發不必等待終端機輸出
+    _LOG_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+    _log_listener: logging.handlers.QueueListener | None = None
     
-    def __init__(self, port, skip_movement_tests: bool = True, baudrate = 115200, timeout = 2, logger: logging.Logger | None = None):
+    def __init__(self, port, skip_movement_tests: bool = True, baudrate = 500000, timeout = 2, logger: logging.Logger | None = None, fail_fast: bool = False):
         """
         Initialize the tester
         
@@ -23,34 +33,70 @@ class ArduinoTMC2209Tester:
             port (str): Serial port (e.g., '/dev/ttyUSB0', 'COM3')
             baudrate (int): Baud rate for serial communication
             timeout (float): Serial timeout in seconds
+            fail_fast (bool): Stop at the first failed test suite or movement step instead of running the rest
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.logger = self._setup_logger() if logger is None else logger
         self.skip_movement_tests = skip_movement_tests
-        self.stepper = ArduinoStepper_TMC2209(self.port, baudrate, timeout, self._setup_logger("ArduinoTMC2209", is_disabled = False, default_level = logging.DEBUG))
+        self.fail_fast = fail_fast
+        self.stepper_logger = self._setup_logger("ArduinoTMC2209", is_disabled = False, default_level = logging.DEBUG)
+        self.stepper = ArduinoStepper_TMC2209(self.port, baudrate, timeout, self.stepper_logger)
+        # 與 self.stepper 共用同一個序列埠，經由 AsyncSerialMux 讓多個測試的命令同時在傳輸中
+        self.async_stepper: ArduinoStepper_TMC2209 | None = None
         
     def _setup_logger(self, logger_name: str = 'ArduinoTMC2209Tester', default_level: Literal = logging.DEBUG, is_disabled: bool = False) -> logging.Logger:
-        """Setup logger with colored formatter"""
+        """Setup logger whose records are queued for the colored console listener. A logger that already has its handler is reused as is."""
         logger = logging.getLogger(logger_name)
         logger.setLevel(default_level)
+        # 避免經由 root logger 重複輸出
+        logger.propagate = False
+        if logger.handlers:
+            return logger
         
-        # Remove existing handlers
-        for handler in logger.handlers[:]:
-            logger.removeHandler(handler)
-        
-        # Create console handler
-        console_handler = logging.StreamHandler() if not is_disabled else logging.NullHandler()
-        console_handler.setLevel(default_level)
-        
-        # Use the colored formatter
-        formatter = ColoredLoggingFormatter.instance()
-        console_handler.setFormatter(formatter)
+        if is_disabled:
+            handler = logging.NullHandler()
+        else:
+            ArduinoTMC2209Tester._start_log_listener()
+            handler = logging.handlers.QueueHandler(ArduinoTMC2209Tester._LOG_QUEUE)
+        handler.setLevel(default_level)
         
-        logger.addHandler(console_handler)
+        logger.addHandler(handler)
         return logger
     
+    @classmethod
+    def _start_log_listener(cls) -> None:
+        """Start the process-wide listener that formats queued records and writes them to the console"""
+        if cls._log_listener is not None:
+            return
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(cls._FORMATTER)
+        cls._log_listener = logging.handlers.QueueListener(cls._LOG_QUEUE, console_handler)
+        cls._log_listener.start()
+        atexit.register(cls._log_listener.stop)
+    
+    def _ok(self, msg: str, *args) -> None:
+        """Log a passed check, skipping the colored formatting entirely when INFO is disabled"""
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(msg, *args)
+
+    def _fail(self, msg: str, *args, level: int = logging.ERROR) -> None:
+        """Log a failed check, skipping the colored formatting entirely when level is disabled"""
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args)
+
+    def _check(self, response, ok: tuple, failed: tuple) -> bool:
+        """
+        Log the outcome of a command and return whether it succeeded.
+        ok and failed are (format, *args) for the success and failure record; only the matching one is
+        formatted, and not at all if its level is disabled.
+        """
+        level, record = (logging.INFO, ok) if response.success else (logging.ERROR, failed)
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, *record)
+        return response.success
+
     def connect(self):
         """Connect to Arduino via serial port"""
         return self.stepper.connect()
@@ -59,7 +105,7 @@ class ArduinoTMC2209Tester:
         """Disconnect from Arduino"""
         return self.stepper.disconnect()
     
-    def test_basic_commands(self) -> bool:
+    async def test_basic_commands(self) -> bool:
         """Test basic TMC2209 commands"""
         self.logger.info("=== Testing Basic Commands ===")
         
@@ -67,38 +113,22 @@ class ArduinoTMC2209Tester:
         
         # Test 1: Enable driver
         self.logger.info("Test 1: Enable driver")
-        response = self.stepper.enable(1)
-        if response.success:
-            self.logger.info("✓ Driver enabled successfully")
-        else:
-            self.logger.error("✗ Failed to enable driver: %s", response.message)
-            all_passed = False
-        
-        time.sleep(0.5)
+        response = await self.async_stepper.enable_async(1)
+        all_passed &= self._check(response, ("✓ Driver enabled successfully",), ("✗ Failed to enable driver: %s", response.message))
         
         # Test 2: Disable driver
         self.logger.info("Test 2: Disable driver")
-        response = self.stepper.enable(0)
-        if response.success:
-            self.logger.info("✓ Driver disabled successfully")
-        else:
-            self.logger.error("✗ Failed to disable driver: %s", response.message)
-            all_passed = False
-        
-        time.sleep(0.5)
+        response = await self.async_stepper.enable_async(0)
+        all_passed &= self._check(response, ("✓ Driver disabled successfully",), ("✗ Failed to disable driver: %s", response.message))
         
         # Test 3: Check hardware disabled status
         self.logger.info("Test 3: Check hardware disabled status")
-        response = self.stepper.is_hardware_disabled()
-        if response.success:
-            self.logger.info("✓ Hardware status: %s", response.message)
-        else:
-            self.logger.error("✗ Failed to check hardware status: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.is_hardware_disabled_async()
+        all_passed &= self._check(response, ("✓ Hardware status: %s", response.message), ("✗ Failed to check hardware status: %s", response.message))
         
         return all_passed
     
-    def test_current_settings(self) -> bool:
+    async def test_current_settings(self) -> bool:
         """Test current setting commands"""
         self.logger.info("=== Testing Current Settings ===")
         
@@ -106,28 +136,18 @@ class ArduinoTMC2209Tester:
         
         # Test run current
         self.logger.info("Test 4: Set run current to 50%")
-        response = self.stepper.set_run_current(50)
-        if response.success:
-            self.logger.info("✓ Run current set successfully")
-        else:
-            self.logger.error("✗ Failed to set run current: %s", response.message)
-            all_passed = False
-        
-        time.sleep(0.5)
+        response = await self.async_stepper.set_run_current_async(50)
+        all_passed &= self._check(response, ("✓ Run current set successfully",), ("✗ Failed to set run current: %s", response.message))
         
         # Test hold current
         self.logger.info("Test 5: Set hold current to 25%")
-        response = self.stepper.set_hold_current(25)
-        if response.success:
-            self.logger.info("✓ Hold current set successfully")
-        else:
-            self.logger.error("✗ Failed to set hold current: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.set_hold_current_async(25)
+        all_passed &= self._check(response, ("✓ Hold current set successfully",), ("✗ Failed to set hold current: %s", response.message))
 
         
         return all_passed
     
-    def test_standstill_modes(self) -> bool:
+    async def test_standstill_modes(self) -> bool:
         """Test standstill mode commands"""
         self.logger.info("=== Testing Standstill Modes ===")
         
@@ -139,19 +159,21 @@ class ArduinoTMC2209Tester:
             (StandstillMode.BRAKING, "BRAKING")
         ]
         
-        for i, (mode, mode_name) in enumerate(modes):
-            self.logger.info("Test 6.%d: Set standstill mode to %s", i + 1, mode_name)
-            response = self.stepper.set_standstill_mode(mode)
-            if response.success:
-                self.logger.info("✓ Standstill mode set to %s", mode_name)
-            else:
-                self.logger.error("✗ Failed to set standstill mode to %s: %s", mode_name, response.message)
-                all_passed = False
-            time.sleep(0.5)
+        # 先送出所有命令再一併收取回應，命令依送出順序執行，最後生效的是最後一個模式
+        if self.logger.isEnabledFor(logging.DEBUG):
+            debug = self.logger.debug
+            for label in [f"Test 6.{i + 1}: Set standstill mode to {mode_name}" for i, (_, mode_name) in enumerate(modes)]:
+                debug(label)
+        set_mode = self.async_stepper.set_standstill_mode_async
+        responses = await asyncio.gather(*(set_mode(mode) for mode, _ in modes))
+        
+        check = self._check
+        for (mode, mode_name), response in zip(modes, responses):
+            all_passed &= check(response, ("✓ Standstill mode set to %s", mode_name), ("✗ Failed to set standstill mode to %s: %s", mode_name, response.message))
         
         return all_passed
     
-    def test_microstepping(self) -> bool:
+    async def test_microstepping(self) -> bool:
         """Test microstepping commands"""
         self.logger.info("=== Testing Microstepping ===")
         
@@ -160,28 +182,25 @@ class ArduinoTMC2209Tester:
         # Test microsteps per step (powers of 2)
         microstep_values = [2, 4, 8]
         
-        for i, microsteps in enumerate(microstep_values):
-            self.logger.info("Test 7.%d: Set microsteps per step to %d", i + 1, microsteps)
-            response = self.stepper.set_microsteps_per_step(microsteps)
-            if response.success:
-                self.logger.info("✓ Microsteps per step set to %d", microsteps)
-            else:
-                self.logger.error("✗ Failed to set microsteps to %d: %s", microsteps, response.message)
-                all_passed = False
-            time.sleep(0.5)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            debug = self.logger.debug
+            for label in [f"Test 7.{i + 1}: Set microsteps per step to {microsteps}" for i, microsteps in enumerate(microstep_values)]:
+                debug(label)
+        set_microsteps = self.async_stepper.set_microsteps_per_step_async
+        responses = await asyncio.gather(*(set_microsteps(microsteps) for microsteps in microstep_values))
+        
+        check = self._check
+        for microsteps, response in zip(microstep_values, responses):
+            all_passed &= check(response, ("✓ Microsteps per step set to %d", microsteps), ("✗ Failed to set microsteps to %d: %s", microsteps, response.message))
         
         # Test microstep exponent
         self.logger.info("Test 8: Set microstep exponent to 3 (2^3 = 8)")
-        response = self.stepper.set_microsteps_per_step_power_of_two(3)
-        if response.success:
-            self.logger.info("✓ Microstep exponent set successfully")
-        else:
-            self.logger.error("✗ Failed to set microstep exponent: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.set_microsteps_per_step_power_of_two_async(3)
+        all_passed &= self._check(response, ("✓ Microstep exponent set successfully",), ("✗ Failed to set microstep exponent: %s", response.message))
         
         return all_passed
     
-    def test_pwm_settings(self) -> bool:
+    async def test_pwm_settings(self) -> bool:
         """Test PWM settings"""
         self.logger.info("=== Testing PWM Settings ===")
         
@@ -189,44 +208,26 @@ class ArduinoTMC2209Tester:
         
         # Test PWM offset
         self.logger.info("Test 9: Set PWM offset to 128")
-        response = self.stepper.set_pwm_offset(128)
-        if response.success:
-            self.logger.info("✓ PWM offset set successfully")
-        else:
-            self.logger.error("✗ Failed to set PWM offset: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.set_pwm_offset_async(128)
+        all_passed &= self._check(response, ("✓ PWM offset set successfully",), ("✗ Failed to set PWM offset: %s", response.message))
 
         self.logger.info("Test 10: Reset PWM offset to 0")
-        response = self.stepper.set_pwm_offset(0)
-        if response.success:
-            self.logger.info("✓ PWM offset reset successfully")
-        else:
-            self.logger.error("✗ Failed to reset PWM offset: %s", response.message)
-            all_passed = False
-        
-        time.sleep(0.5)
+        response = await self.async_stepper.set_pwm_offset_async(0)
+        all_passed &= self._check(response, ("✓ PWM offset reset successfully",), ("✗ Failed to reset PWM offset: %s", response.message))
         
         # Test PWM gradient
         self.logger.info("Test 10: Set PWM gradient to 64")
-        response = self.stepper.set_pwm_gradient(64)
-        if response.success:
-            self.logger.info("✓ PWM gradient set successfully")
-        else:
-            self.logger.error("✗ Failed to set PWM gradient: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.set_pwm_gradient_async(64)
+        all_passed &= self._check(response, ("✓ PWM gradient set successfully",), ("✗ Failed to set PWM gradient: %s", response.message))
         
         # reset PWM gradient to 0
         self.logger.info("Test 11: Reset PWM gradient to 0")
-        response = self.stepper.set_pwm_gradient(0)
-        if response.success:
-            self.logger.info("✓ PWM gradient reset successfully")
-        else:
-            self.logger.error("✗ Failed to reset PWM gradient: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.set_pwm_gradient_async(0)
+        all_passed &= self._check(response, ("✓ PWM gradient reset successfully",), ("✗ Failed to reset PWM gradient: %s", response.message))
         
         return all_passed
 
-    def test_stall_guard_and_standing_still(self) -> bool:
+    async def test_stall_guard_and_standing_still(self) -> bool:
         """Test StallGuard and standing still status commands"""
         self.logger.info("=== Testing StallGuard and Standing Still Status ===")
         
@@ -234,29 +235,19 @@ class ArduinoTMC2209Tester:
         
         # Test 14: Get StallGuard result
         self.logger.info("Test 14: Get StallGuard result")
-        response = self.stepper.get_stall_guard_result()
-        if response.success:
-            stall_value = response.value if response.value is not None else 0
-            self.logger.info("✓ StallGuard result: %s (value: %d)", response.message, stall_value)
-        else:
-            self.logger.error("✗ Failed to get StallGuard result: %s", response.message)
-            all_passed = False
-        
-        time.sleep(0.5)
+        response = await self.async_stepper.get_stall_guard_result_async()
+        stall_value = response.value if response.value is not None else 0
+        all_passed &= self._check(response, ("✓ StallGuard result: %s (value: %d)", response.message, stall_value), ("✗ Failed to get StallGuard result: %s", response.message))
         
         # Test 15: Check if motor is standing still
         self.logger.info("Test 15: Check if motor is standing still")
-        response = self.stepper.is_standing_still()
-        if response.success:
-            standing_still = response.value if response.value is not None else 0
-            self.logger.info("✓ Standing still status: %s (value: %d)", response.message, standing_still)
-        else:
-            self.logger.error("✗ Failed to check standing still status: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.is_standing_still_async()
+        standing_still = response.value if response.value is not None else 0
+        all_passed &= self._check(response, ("✓ Standing still status: %s (value: %d)", response.message, standing_still), ("✗ Failed to check standing still status: %s", response.message))
         
         return all_passed
     
-    def test_communication(self) -> bool:
+    async def test_communication(self) -> bool:
         """Test communication status"""
         self.logger.info("=== Testing Communication ===")
         
@@ -264,16 +255,12 @@ class ArduinoTMC2209Tester:
         
         # Test communication status
         self.logger.info("Test 11: Check communication status")
-        response = self.stepper.is_setup_and_communicating()
-        if response.success:
-            self.logger.info("✓ Communication status: %s", response.message)
-        else:
-            self.logger.error("✗ Failed to check communication status: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.is_setup_and_communicating_async()
+        all_passed &= self._check(response, ("✓ Communication status: %s", response.message), ("✗ Failed to check communication status: %s", response.message))
         
         return all_passed
 
-    def test_reset_to_safe_current(self) -> bool:
+    async def test_reset_to_safe_current(self) -> bool:
         """Test reset to safe current"""
         self.logger.info("=== Testing Reset to Safe Current ===")
         
@@ -281,16 +268,12 @@ class ArduinoTMC2209Tester:
         
         # Test reset to safe current
         self.logger.info("Test 12: Reset to safe current")
-        response = self.stepper.reset_to_safe_current()
-        if response.success:
-            self.logger.info("✓ Reset to safe current successfully")
-        else:
-            self.logger.error("✗ Failed to reset to safe current: %s", response.message)
-            all_passed = False
+        response = await self.async_stepper.reset_to_safe_current_async()
+        all_passed &= self._check(response, ("✓ Reset to safe current successfully",), ("✗ Failed to reset to safe current: %s", response.message))
         
         return all_passed
     
-    def test_error_handling(self) -> bool:
+    async def test_error_handling(self) -> bool:
         """Test error handling with invalid commands"""
         self.logger.info("=== Testing Error Handling ===")
         
@@ -298,22 +281,20 @@ class ArduinoTMC2209Tester:
         
         # Test invalid current percentage (should be handled by Arduino)
         self.logger.info("Test 12: Test invalid current percentage (should fail)")
-        response = self.stepper.set_run_current(150)  # Invalid current percentage > 100
+        response = await self.async_stepper.set_run_current_async(150)  # Invalid current percentage > 100
         if not response.success:
-            self.logger.info("✓ Error handling works correctly: %s", response.message)
+            self._ok("✓ Error handling works correctly: %s", response.message)
         else:
-            self.logger.warning("✗ Error handling may not be working")
+            self._fail("✗ Error handling may not be working", level = logging.WARNING)
             all_passed = False
         
-        time.sleep(0.5)
-        
         # Test invalid microstep value (should be handled by Arduino)
         self.logger.info("Test 13: Test invalid microstep value (should fail)")
-        response = self.stepper.set_microsteps_per_step(3)  # Invalid microstep (not power of 2)
+        response = await self.async_stepper.set_microsteps_per_step_async(3)  # Invalid microstep (not power of 2)
         if not response.success:
-            self.logger.info("✓ Invalid microstep handling works correctly: %s", response.message)
+            self._ok("✓ Invalid microstep handling works correctly: %s", response.message)
         else:
-            self.logger.warning("✗ Invalid microstep handling may not be working")
+            self._fail("✗ Invalid microstep handling may not be working", level = logging.WARNING)
             all_passed = False
         
         return all_passed
@@ -327,13 +308,14 @@ class ArduinoTMC2209Tester:
         
         self.logger.info("=== Testing Movement Commands ===")
         
+        all_passed = True
+        
         # Warning and user confirmation
         self.logger.info("Resetting to safe current")
         response = self.stepper.reset_to_safe_current()
-        if response.success:
-            self.logger.info("✓ Reset to safe current successfully")
-        else:
-            self.logger.error("✗ Failed to reset to safe current: %s", response.message)
+        if not self._check(response, ("✓ Reset to safe current successfully",), ("✗ Failed to reset to safe current: %s", response.message)):
+            if self.fail_fast:
+                return False
             all_passed = False
         
         self.stepper.enable(True)
@@ -345,78 +327,107 @@ class ArduinoTMC2209Tester:
             self.logger.info("Skipping movement tests as requested by user")
             return True  # Return True since user chose to skip (not a failure)
         
-        all_passed = True
         TEST_SPEED = 50
         
         # Test 16: Move at positive velocity
         self.logger.info("Test 16: Move at positive velocity (%d)", TEST_SPEED)
         response = self.stepper.move_at_velocity(TEST_SPEED)
-        if response.success:
-            self.logger.info("✓ Motor started moving at velocity %d", TEST_SPEED)
-        else:
-            self.logger.error("✗ Failed to start movement: %s", response.message)
+        if not self._check(response, ("✓ Motor started moving at velocity %d", TEST_SPEED), ("✗ Failed to start movement: %s", response.message)):
             all_passed = False
+            if self.fail_fast:
+                return False
         
         time.sleep(5)  # Let motor run for 5 seconds
         
         # Test 17: Stop moving
         self.logger.info("Test 17: Stop moving")
         response = self.stepper.stop_moving()
-        if response.success:
-            self.logger.info("✓ Motor stopped successfully")
-        else:
-            self.logger.error("✗ Failed to stop motor: %s", response.message)
+        if not self._check(response, ("✓ Motor stopped successfully",), ("✗ Failed to stop motor: %s", response.message)):
             all_passed = False
             # Disable motor if stop_moving fails
             self.logger.error("Disabling motor due to stop failure")
             disable_response = self.stepper.enable(False)
-            if disable_response.success:
-                self.logger.info("✓ Motor disabled successfully")
-            else:
-                self.logger.error("✗ Failed to disable motor: %s", disable_response.message)
+            self._check(disable_response, ("✓ Motor disabled successfully",), ("✗ Failed to disable motor: %s", disable_response.message))
+            if self.fail_fast:
+                return False
         
         time.sleep(1)
         
         # Test 18: Move at negative velocity (reverse direction)
         self.logger.info("Test 18: Move at negative velocity (-%d)", TEST_SPEED)
         response = self.stepper.move_at_velocity(-TEST_SPEED)
-        if response.success:
-            self.logger.info("✓ Motor started moving at velocity -%d", TEST_SPEED)
-        else:
-            self.logger.error("✗ Failed to start reverse movement: %s", response.message)
+        if not self._check(response, ("✓ Motor started moving at velocity -%d", TEST_SPEED), ("✗ Failed to start reverse movement: %s", response.message)):
             all_passed = False
+            if self.fail_fast:
+                return False
         
         time.sleep(2)  # Let motor run for 2 seconds
         
         # Test 19: Stop moving again
         self.logger.info("Test 19: Stop moving again")
         response = self.stepper.stop_moving()
-        if response.success:
-            self.logger.info("✓ Motor stopped successfully")
-        else:
-            self.logger.error("✗ Failed to stop motor: %s", response.message)
+        if not self._check(response, ("✓ Motor stopped successfully",), ("✗ Failed to stop motor: %s", response.message)):
             all_passed = False
             # Disable motor if stop_moving fails
             self.logger.error("Disabling motor due to stop failure")
             disable_response = self.stepper.enable(False)
-            if disable_response.success:
-                self.logger.info("✓ Motor disabled successfully")
-            else:
-                self.logger.error("✗ Failed to disable motor: %s", disable_response.message)
+            self._check(disable_response, ("✓ Motor disabled successfully",), ("✗ Failed to disable motor: %s", disable_response.message))
+            if self.fail_fast:
+                return False
         
         time.sleep(1)
         
         # Test 20: Move at zero velocity (should stop)
         self.logger.info("Test 20: Move at zero velocity (should stop)")
         response = self.stepper.move_at_velocity(0)
-        if response.success:
-            self.logger.info("✓ Motor set to zero velocity")
-        else:
-            self.logger.error("✗ Failed to set zero velocity: %s", response.message)
+        if not self._check(response, ("✓ Motor set to zero velocity",), ("✗ Failed to set zero velocity: %s", response.message)):
             all_passed = False
         
         return all_passed
     
+    async def run_register_tests(self) -> bool:
+        """
+        Run the tests that only set registers or read status.
+        Tests touching different registers run concurrently over one AsyncSerialMux. The enable test runs
+        first and reset to safe current always runs last, also when fail_fast ends the run early, since it
+        restores the current and PWM settings.
+        """
+        all_passed = True
+        try:
+            async with AsyncSerialMux(self.stepper.serial_conn, self.timeout, self.stepper_logger) as mux:
+                self.async_stepper = ArduinoStepper_TMC2209(self.port, self.baudrate, self.timeout, self.stepper_logger, mux = mux)
+                try:
+                    if not await self.test_basic_commands():
+                        all_passed = False
+                        self.logger.error("Basic commands test failed")
+                        if self.fail_fast:
+                            return False
+
+                    concurrent_tests = {
+                        "Current settings": self.test_current_settings(),
+                        "Standstill modes": self.test_standstill_modes(),
+                        "Microstepping": self.test_microstepping(),
+                        "PWM settings": self.test_pwm_settings(),
+                        "StallGuard and standing still": self.test_stall_guard_and_standing_still(),
+                        "Communication": self.test_communication(),
+                        "Error handling": self.test_error_handling(),
+                    }
+                    results = await asyncio.gather(*concurrent_tests.values())
+                    for test_name, passed in zip(concurrent_tests, results):
+                        if not passed:
+                            all_passed = False
+                            self.logger.error("%s test failed", test_name)
+                    if self.fail_fast and not all_passed:
+                        return False
+                finally:
+                    # fail_fast 提前返回時也要還原安全電流，不讓驅動器停留在測試用的電流與 PWM 設定
+                    if not await self.test_reset_to_safe_current():
+                        all_passed = False
+                        self.logger.error("Reset to safe current test failed")
+        finally:
+            self.async_stepper = None
+        return all_passed
+
     def run_all_tests(self) -> bool:
         """Run all test suites"""
         self.logger.info("Starting Arduino TMC2209 Test Suite")
@@ -428,42 +439,8 @@ class ArduinoTMC2209Tester:
         all_tests_passed = True
         
         try:
-            # Run basic tests first
-            if not self.test_basic_commands():
-                all_tests_passed = False
-                self.logger.error("Basic commands test failed")
-            
-            if not self.test_current_settings():
-                all_tests_passed = False
-                self.logger.error("Current settings test failed")
-            
-            if not self.test_standstill_modes():
-                all_tests_passed = False
-                self.logger.error("Standstill modes test failed")
-            
-            if not self.test_microstepping():
-                all_tests_passed = False
-                self.logger.error("Microstepping test failed")
-            
-            if not self.test_pwm_settings():
-                all_tests_passed = False
-                self.logger.error("PWM settings test failed")
-            
-            if not self.test_stall_guard_and_standing_still():
-                all_tests_passed = False
-                self.logger.error("StallGuard and standing still test failed")
-            
-            if not self.test_communication():
-                all_tests_passed = False
-                self.logger.error("Communication test failed")
-            
-            if not self.test_error_handling():
-                all_tests_passed = False
-                self.logger.error("Error handling test failed")
-
-            if not self.test_reset_to_safe_current():
+            if not asyncio.run(self.run_register_tests()):
                 all_tests_passed = False
-                self.logger.error("Reset to safe current test failed")
             
             # Only run movement tests if all other tests passed
             if all_tests_passed:
@@ -503,7 +480,7 @@ def list_available_ports():
     
     print("Available serial ports:")
     for i, port in enumerate(ports):
-        print("  %d: %s - %s", i, port.device, port.description)
+        print(f"  {i}: {port.device} - {port.description}")
     
     return [port.device for port in ports]
 
@@ -520,12 +497,14 @@ def main():
     parser = argparse.ArgumentParser(description='Test Arduino TMC2209 functionality')
     parser.add_argument('--port', '-p', default=None,
                        help='Serial port (default: auto-detect)')
-    parser.add_argument('--baudrate', '-b', type=int, default=115200,
-                       help='Baud rate (default: 115200)')
+    parser.add_argument('--baudrate', '-b', type=int, default=500000,
+                       help='Baud rate, must match the firmware (default: 500000)')
     parser.add_argument('--timeout', '-t', type=float, default=2.0,
                        help='Serial timeout in seconds (default: 2.0)')
     parser.add_argument('--skip_movement_tests', type = str2bool, default = True,
                        help='Skip movement tests (default: True)')
+    parser.add_argument('--fail_fast', type = str2bool, default = False,
+                       help='Stop at the first failed test suite (default: False)')
     parser.add_argument('--list-ports', '-l', action='store_true',
                        help='List available serial ports and exit')
     
@@ -541,7 +520,8 @@ def main():
         port=args.port,
         baudrate=args.baudrate,
         timeout=args.timeout,
-        skip_movement_tests=args.skip_movement_tests
+        skip_movement_tests=args.skip_movement_tests,
+        fail_fast=args.fail_fast
     )
     
     tester.run_all_tests()
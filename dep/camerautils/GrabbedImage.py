@@ -1,11 +1,46 @@
 import numpy as np
 import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Mapping
 from .CameraEnum import CameraEnum
+from .PixelFormatEnum import PixelFormatEnum
 
-@dataclass(slots = True)
+# 共用的唯讀空字典，沒有額外資訊的影像不必各自配置一個 dict
+_EMPTY_INFO: Mapping[str, Any] = MappingProxyType({})
+
+@dataclass(slots = True, frozen = True, eq = False)
 class GrabbedImage:
+    """
+    Frames are compared and hashed by the image array object (identity, not pixel content) and the timestamp,
+    so they can be used as dict keys without element-wise comparisons.
+    timestamp_ns is the wall clock time of the grab in nanoseconds since the epoch (time.time_ns());
+    the timestamp property converts it to a datetime only when read.
+    additional_info defaults to a shared read-only empty mapping and may be a read-only mapping shared
+    by all frames of a camera; use set_info to add entries.
+    """
     image: np.ndarray
-    timestamp: datetime.datetime
+    timestamp_ns: int
     camera: CameraEnum
-    additional_info: dict[str, any]
\ No newline at end of file
+    pixel_format: PixelFormatEnum
+    # mappingproxy 不可雜湊，dataclass 不接受其作為預設值，故以 factory 回傳同一個共用物件
+    additional_info: Mapping[str, Any] = field(default_factory = lambda: _EMPTY_INFO)
+
+    def __hash__(self) -> int:
+        return hash((id(self.image), self.timestamp_ns))
+
+    def __eq__(self, other: object) -> bool:
+        # 與 __hash__ 使用相同的鍵；影像以 is 比較，不逐元素比較像素
+        if not isinstance(other, GrabbedImage):
+            return NotImplemented
+        return self.image is other.image and self.timestamp_ns == other.timestamp_ns
+
+    @property
+    def timestamp(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.timestamp_ns / 1e9)
+
+    def set_info(self, key: str, value: Any) -> None:
+        """Add an entry to additional_info, copying a shared read-only mapping into a dict on first use"""
+        if isinstance(self.additional_info, MappingProxyType):
+            object.__setattr__(self, "additional_info", dict(self.additional_info))
+        self.additional_info[key] = value
\ No newline at end of file
@@ -1,10 +1,10 @@
+import time
 import logging
-import datetime
 import pypylon.pylon
 from pathlib import Path
-from os import path, makedirs
 from pypylon import pylon
-from typing import Tuple
+from types import MappingProxyType
+from typing import Any, Mapping, Tuple
 from pypylon.pylon import TimeoutHandling_ThrowException, TimeoutException, ImageFormatConverter
 from pypylon.pylon import InstantCamera, GrabResult
 from pypylon.genicam import INodeMap, IEnumeration, IEnumEntry, INode, IFloat, IInteger, IBoolean
@@ -20,14 +20,47 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
     Implements the FrameProviderAbc interface.
     """
 
+    # 各屬性存取的 GenICam 節點，initialize_camera 時一次解析並放入節點快取
+    _PROPERTY_NODE_NAMES: Tuple[str, ...] = (
+        "AcquisitionFrameRate", "AcquisitionFrameRateEnable", "BalanceRatio", "BalanceRatioSelector",
+        "BalanceWhiteAuto", "ExposureAuto", "ExposureTime", "Gain", "GainAuto", "Gamma", "Height",
+        "PixelFormat", "ShutterMode", "Width",
+    )
+
+    # 寫入節點後需丟棄快取上下限的浮點節點。曝光時間、影像尺寸與像素格式會改變最大幀率，
+    # 像素格式與自動模式會改變增益與白平衡的範圍；未列出的節點（例如 Gain、Gamma）不影響其他節點的範圍
+    _FLOAT_LIMIT_DEPENDENTS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+        "AcquisitionFrameRate": ("ExposureTime",),
+        "AcquisitionFrameRateEnable": ("AcquisitionFrameRate", "ExposureTime"),
+        "BalanceRatioSelector": ("BalanceRatio",),
+        "BalanceWhiteAuto": ("BalanceRatio",),
+        "ExposureAuto": ("ExposureTime",),
+        "ExposureTime": ("AcquisitionFrameRate",),
+        "GainAuto": ("Gain",),
+        "Height": ("AcquisitionFrameRate", "ExposureTime"),
+        "PixelFormat": ("AcquisitionFrameRate", "BalanceRatio", "ExposureTime", "Gain"),
+        "ShutterMode": ("AcquisitionFrameRate", "ExposureTime"),
+        "Width": ("AcquisitionFrameRate", "ExposureTime"),
+    })
+
     def __init__(self, camera: InstantCamera, pixel_format:PixelFormatEnum = PixelFormatEnum.BGR8, logger: logging.Logger | None = None):
 
         self.__camera: InstantCamera = InstantCamera(camera)
         self.__node_map: INodeMap | None = None
+        # 節點名稱對應的 INode 快取，省去每次存取設定時經由 SWIG 以字串查找節點
+        self.__node_cache: dict[str, INode] = {}
+        # 浮點節點的 (最小值, 最大值) 快取。寫入節點後只丟棄 _FLOAT_LIMIT_DEPENDENTS 中受其影響的節點
+        self.__float_limits_cache: dict[str, Tuple[float, float]] = {}
+        # 列舉節點可用的符號名稱快取，與節點快取一同失效
+        self.__enum_symbols_cache: dict[str, frozenset[str]] = {}
         self.__camera_name: str = ""
+        # 每張影像共用的唯讀 additional_info，相機名稱不變，故只在 initialize_camera 建立一次
+        self.__frame_info: Mapping[str, Any] = MappingProxyType({"camera_name": ""})
         self.__pixel_format = pixel_format
         self.__pylon_image_converter = ImageFormatConverter()
         self.__pylon_image_converter.OutputPixelFormat = PylonCameraWrapper.__get_pylon_pixel_format(pixel_format)
+        # 轉換結果寫入同一個 PylonImage，尺寸與格式不變時不必每張影像重新配置緩衝區
+        self.__converted_image = pylon.PylonImage()
         
         if logger is not None:
             self.__logger: logging.Logger = logger
@@ -35,9 +68,17 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
             self.__logger: logging.Logger = logging.getLogger(__name__)
             self.__logger.addHandler(logging.NullHandler())
 
-    def start_camera_streaming(self):
-
-        self.__camera.StartGrabbing()
+    def start_camera_streaming(self, strategy: int = pylon.GrabStrategy_LatestImageOnly, num_buffers: int = 10):
+        """
+        Start grabbing with the given pylon grab strategy.
+        The default GrabStrategy_LatestImageOnly keeps only the newest frame, so get_frame never returns a stale
+        queued frame and a slow consumer drops frames instead of stalling the stream.
+        num_buffers sets MaxNumBuffer, and also the output queue size for GrabStrategy_LatestImages.
+        """
+        self.__camera.MaxNumBuffer.SetValue(num_buffers)
+        if strategy == pylon.GrabStrategy_LatestImages:
+            self.__camera.OutputQueueSize.SetValue(num_buffers)
+        self.__camera.StartGrabbing(strategy)
         self.__logger.info("Camera started streaming")
 
     def stop_camera_streaming(self):
@@ -60,7 +101,12 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
     def initialize_camera(self):
         self.__camera.Open()
         self.__node_map = self.__camera.GetNodeMap()
+        self.__node_cache = {}
+        self.__float_limits_cache = {}
+        self.__enum_symbols_cache = {}
+        self.__resolve_property_nodes()
         self.__camera_name = self.__camera.GetDeviceInfo().GetFriendlyName()
+        self.__frame_info = MappingProxyType({"camera_name": self.__camera_name})
 
     def log_camera_info(self):
         """Log camera information to the logger."""
@@ -77,16 +123,27 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
         except TimeoutException as te:
             return te
 
-        if not grab_image_result.GrabSucceeded():
-            return RuntimeError("Failed to grab image.")
+        try:
+            if not grab_image_result.GrabSucceeded():
+                return RuntimeError("Failed to grab image.")
+
+            # 相機輸出已是目標格式時直接取出影像，省去轉換時多一次的整張影像複製
+            # GetArray 的複製不可省略：緩衝區在下方 Release 後即歸還相機重複使用，而 GrabbedImage 的生命週期更長
+            if self.__pylon_image_converter.ImageHasDestinationFormat(grab_image_result):
+                image = grab_image_result.GetArray()
+            else:
+                self.__pylon_image_converter.Convert(self.__converted_image, grab_image_result)
+                image = self.__converted_image.GetArray()
+        finally:
+            # 影像已複製到 numpy 陣列，立即將緩衝區歸還給相機的緩衝池
+            grab_image_result.Release()
 
         return GrabbedImage(
-            image = self.__pylon_image_converter.Convert(grab_image_result).GetArray(),
-            timestamp = datetime.datetime.now(),
+            image = image,
+            timestamp_ns = time.time_ns(),
             camera = CameraEnum.Pylon,
-            additional_info = {
-                "camera_name": self.__camera_name
-            }
+            pixel_format = self.__pixel_format,
+            additional_info = self.__frame_info
         )
 
     def save_camera_settings(self, file_path:str | Path) -> Exception | None:
@@ -103,13 +160,13 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
         if not file_path.endswith(".pfs"):
             self.__logger.warning(f"File path does not end with .pfs: {file_path}")
 
-        # Create the directory if it does not exist
-        if not path.exists(path.dirname(file_path)):
-            try:
-                makedirs(path.dirname(file_path))
-            except Exception as e:
-                self.__logger.error(f"Error creating directory {path.dirname(file_path)}: {e}")
-                return e
+        # Create the directory if it does not exist. exist_ok 讓已存在的目錄不必先另外檢查一次
+        directory: Path = Path(file_path).parent
+        try:
+            directory.mkdir(parents = True, exist_ok = True)
+        except Exception as e:
+            self.__logger.error(f"Error creating directory {directory}: {e}")
+            return e
 
         try:
             pylon.FeaturePersistence.Save(file_path, self.__node_map)
@@ -132,6 +189,11 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
         except Exception as e:
             self.__logger.error(f"Error loading camera settings from {file_path}: {e}")
             return e
+        finally:
+            self.__node_cache.clear()
+            self.__float_limits_cache.clear()
+            self.__enum_symbols_cache.clear()
+            self.__resolve_property_nodes()
         
         self.__logger.info(f"Camera settings loaded from {file_path}")
 
@@ -441,23 +503,43 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
 
     def __get_node(self, node_name:str) -> INode | Exception:
         """
-        Acquires the node from node map using the node name.
+        Acquires the node from node map using the node name. Resolved nodes are cached until the node map changes.
         Returns the node if successful, or an exception if an error occurs.
         """
+        node: INode | None = self.__node_cache.get(node_name)
+        if node is not None:
+            return node
         try:
             if self.__node_map is None:
                 return RuntimeError("Cannot access camera setting because node map is not initialized")
-            node:INode = self.__node_map.GetNode(node_name)
+            node = self.__node_map.GetNode(node_name)
+            self.__node_cache[node_name] = node
             return node
         except Exception as e:
             return e
 
+    def __resolve_property_nodes(self) -> None:
+        """Resolve the nodes behind the properties up front so property access never looks up a node by name"""
+        if self.__node_map is None:
+            return
+        for node_name in PylonCameraWrapper._PROPERTY_NODE_NAMES:
+            try:
+                node: INode | None = self.__node_map.GetNode(node_name)
+            except Exception:
+                # 此型號相機沒有該節點，存取對應屬性時由 __get_node 回報錯誤
+                continue
+            if node is not None:
+                self.__node_cache[node_name] = node
+
     def __read_node(self, node_name:str) -> float | Exception:
         """
         Returns the value of a float node.
         Returns the value if successful, or an exception if an error occurs.
         """
         try:
+            node: INode | None = self.__node_cache.get(node_name)
+            if node is not None:
+                return node.Value
             node_result = self.__get_node(node_name)
             if isinstance(node_result, Exception):
                 return node_result
@@ -467,6 +549,11 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
         except Exception as e:
             return e
 
+    def __invalidate_dependent_float_limits(self, written_node_name:str) -> None:
+        """Drop the cached limits of the float nodes whose range depends on written_node_name"""
+        for node_name in PylonCameraWrapper._FLOAT_LIMIT_DEPENDENTS.get(written_node_name, ()):
+            self.__float_limits_cache.pop(node_name, None)
+
     def __write_bool_node(self, node_name:str, new_value:bool) -> Exception | None:
         """
         Writes the value of the bool node.
@@ -478,6 +565,7 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
                 return node_result
             node:IBoolean = node_result
             node.SetValue(new_value)
+            self.__invalidate_dependent_float_limits(node_name)
             return None
             
         except Exception as e:
@@ -485,7 +573,7 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
 
     def __write_float_node(self, node_name:str, new_value:float) -> Exception | None:
         """
-        Writes the value of the float node.
+        Writes the value of the float node after checking it against the node's cached (min, max).
         Returns None if successful, or an exception if an error occurs.
         """
         try:
@@ -493,13 +581,22 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
             if isinstance(node_result, Exception):
                 return node_result
             node:IFloat = node_result
-            minimal_allowed_value:float = node.GetMin()
-            maximal_allowed_value:float = node.GetMax()
+            limits: Tuple[float, float] | None = self.__float_limits_cache.get(node_name)
+            # 相機在自動模式下會自行改變範圍（例如自動曝光改變最大幀率），超出快取範圍時先重新讀取一次再拒絕
+            if limits is None or not (limits[0] <= new_value <= limits[1]):
+                limits = self.__float_limits_cache[node_name] = (node.GetMin(), node.GetMax())
+            minimal_allowed_value, maximal_allowed_value = limits
             
             if not (minimal_allowed_value <= new_value <= maximal_allowed_value):
                 return ValueError(f"Invalid value: {new_value}. Must be between {minimal_allowed_value} and {maximal_allowed_value}")
             
-            node.SetValue(new_value)
+            try:
+                node.SetValue(new_value)
+            except Exception:
+                # 相機拒絕寫入時快取的範圍可能已過時，下次寫入重新讀取
+                self.__float_limits_cache.pop(node_name, None)
+                raise
+            self.__invalidate_dependent_float_limits(node_name)
             return None
 
         except Exception as e:
@@ -516,6 +613,7 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
                 return node_result
             node:IInteger = node_result
             node.SetValue(new_value)
+            self.__invalidate_dependent_float_limits(node_name)
             return None
             
         except Exception as e:
@@ -531,12 +629,16 @@ class PylonCameraWrapper(FrameProviderAbc, SettingPersistentCameraAbc):
             if isinstance(node_result, Exception):
                 return node_result
             node:IEnumeration = node_result
-            valid_entries: Tuple[IEnumEntry] = node.GetEntries()
+            valid_symbols: frozenset[str] | None = self.__enum_symbols_cache.get(node_name)
+            if valid_symbols is None:
+                valid_entries: Tuple[IEnumEntry] = node.GetEntries()
+                valid_symbols = self.__enum_symbols_cache[node_name] = frozenset(e.Symbolic for e in valid_entries)
             
-            if new_value not in (e.Symbolic for e in valid_entries):
-                return ValueError(f"Invalid value: {new_value}. Can only be one of {[e.Symbolic for e in valid_entries]}")
+            if new_value not in valid_symbols:
+                return ValueError(f"Invalid value: {new_value}. Can only be one of {sorted(valid_symbols)}")
             
             node.SetValue(new_value)
+            self.__invalidate_dependent_float_limits(node_name)
             return None
             
         except Exception as e:
@@ -1,10 +1,24 @@
 import asyncio
+import os
+import select
+import socket
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from logging import Formatter, Handler
-from typing import Optional
-from tmc_driver.tmc_220x import Tmc220x, MovementAbsRel, StopMode, MovementAbsRel, DrvStatus, GConf, GStat, Ioin, ChopConf, Loglevel
-from tmc_driver.tmc_2209 import Tmc2209, TmcComUart, TmcEnableControlPin, TmcMotionControlStepDir, TmcMotionControlVActual
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from tmc_driver.tmc_220x import MovementAbsRel, StopMode, Loglevel
+
+if TYPE_CHECKING:
+    from tmc_driver.tmc_220x import Tmc220x, DrvStatus, GConf, GStat, Ioin, ChopConf
+
+class TmcStatusBundle(NamedTuple):
+    """Status registers read together by Tmc220xStepperWrapper.read_status_bundle."""
+    drv_status: 'DrvStatus'
+    gconf: 'GConf'
+    gstat: 'GStat'
+    ioin: 'Ioin'
+    chopconf: 'ChopConf'
 
 class Tmc2209StepperComUartWrapperFactory():
 
@@ -33,6 +47,8 @@ class Tmc2209StepperComUartWrapperFactory():
             max_step_per_second (int): The maximum step per second.
             full_step_per_rev (int): The full step per revolution.
         """
+        # 只有建立馬達時才載入 TMC2209 驅動堆疊
+        from tmc_driver.tmc_2209 import Tmc2209, TmcComUart, TmcEnableControlPin, TmcMotionControlStepDir, TmcMotionControlVActual
 
         enable_control_pin: TmcEnableControlPin = TmcEnableControlPin(enable_pin)
         motion_control_vactual: TmcMotionControlVActual = TmcMotionControlVActual()
@@ -51,419 +67,162 @@ class Tmc2209StepperComUartWrapperFactory():
 class Tmc220xStepperWrapper:
     """Async adapter for Tmc220x blocking operations."""
 
-    def __init__(self, stepper: Tmc220x):
+    def __init__(self, stepper: 'Tmc220x'):
         """Initialize the Tmc220xStepperWrapper.
         
         Args:
             stepper (Tmc220x): The Tmc220x instance to wrap.
         """
 
-        if not isinstance(stepper, Tmc220x):
-            raise ValueError("Stepper must inherit from Tmc220x.")
+        # 僅供開發時檢查，python -O 下整段略過
+        if __debug__:
+            from tmc_driver.tmc_220x import Tmc220x
+            assert isinstance(stepper, Tmc220x), "Stepper must inherit from Tmc220x."
 
         self.__stepper: Tmc220x = stepper
+        # 快取常用的屬性鏈，急停路徑上少一次屬性查找
+        self.__mc = stepper.tmc_mc
+        self.__logger = stepper.logger
+        self.__tmc_logger = stepper.tmc_logger
         self.__emergency_stop_thread: Optional[threading.Thread] = None
-        self.__emergency_stop_event: threading.Event = threading.Event()
-        self.__emergency_stop_running: bool = False
+        self.__emergency_stop_triggered: bool = False
         self.__emergency_stop_lock: threading.Lock = threading.Lock()
+        self.__emergency_stop_task: Optional[asyncio.Task] = None
+        self.__emergency_stop_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__emergency_stop_aio_event: Optional[asyncio.Event] = None
+        # 觸發急停只需寫入一次 fd，不需取得任何 Python 鎖
+        # Linux 使用 eventfd；其餘平台使用 socketpair (Windows 的 select 只接受 socket)
+        self.__emergency_stop_eventfd: Optional[int] = None
+        self.__emergency_stop_sockets: Optional[tuple[socket.socket, socket.socket]] = None
+        if hasattr(os, 'eventfd'):
+            self.__emergency_stop_eventfd = os.eventfd(0, os.EFD_NONBLOCK)
+        else:
+            self.__emergency_stop_sockets = socket.socketpair()
+            for sock in self.__emergency_stop_sockets:
+                sock.setblocking(False)
+        # 驅動程式不可重入，所有移動指令都在同一條執行緒上依序執行
+        self.__motion_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TmcMotion")
+        # 預先啟動工作執行緒，避免第一次移動時才建立執行緒的延遲
+        self.__motion_executor.submit(lambda: None).result()
 
     def emergency_stop(self):
         """Emergency stop the stepper. And set the motor enabled to False."""
-        self.__stepper.tmc_mc.stop(stop_mode = StopMode.HARDSTOP)
+        self.__mc.stop(stop_mode = StopMode.HARDSTOP)
         self.__stepper.set_motor_enabled(False)
     
     def start_emergency_stop_thread(self):
         """Start the emergency stop monitoring thread."""
-        self.__stepper.logger.info("Starting emergency stop thread. Call trigger_emergency_stop to trigger the emergency stop.")
+        self.__logger.info("Starting emergency stop thread. Call trigger_emergency_stop to trigger the emergency stop.")
 
         with self.__emergency_stop_lock:
 
-            if not self.__emergency_stop_running:
-                self.__emergency_stop_running = True
+            if self.__emergency_stop_thread is None or not self.__emergency_stop_thread.is_alive():
                 self.__emergency_stop_thread = threading.Thread(
                     target=self.__emergency_stop_thread_worker,
                     name="EmergencyStopThread",
                     daemon=True
                 )
                 self.__emergency_stop_thread.start()
+                self.__prioritize_emergency_stop_thread(self.__emergency_stop_thread)
     
     def trigger_emergency_stop(self):
-        """Trigger an emergency stop event."""
-        self.__stepper.tmc_logger.log("Emergency stop event triggered.", Loglevel.ERROR)
-        self._emergency_stop_event.set()
+        """
+        Trigger an emergency stop event. Does not take the emergency stop lock, so it never waits behind the monitor.
+        Not safe to call from a signal handler: it schedules a callback on the monitoring event loop and logs.
+        """
+        self.__emergency_stop_triggered = True
+        self.__wake_emergency_stop_thread()
+        loop = self.__emergency_stop_loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.__emergency_stop_aio_event.set)
+            except RuntimeError:
+                # 事件迴圈已關閉，僅由執行緒監控處理
+                pass
+        self.__tmc_logger.log("Emergency stop event triggered.", Loglevel.ERROR)
     
+    async def start_emergency_stop_task(self) -> asyncio.Task:
+        """Start the emergency stop monitor as a task on the running event loop instead of a dedicated thread.
+
+        Returns:
+            asyncio.Task: The monitoring task. Cancel it or call stop_emergency_stop_task to stop monitoring.
+        """
+        if self.__emergency_stop_task is None or self.__emergency_stop_task.done():
+            self.__emergency_stop_aio_event = asyncio.Event()
+            self.__emergency_stop_loop = asyncio.get_running_loop()
+            self.__emergency_stop_task = asyncio.create_task(self.__emergency_stop_task_worker(), name="EmergencyStopTask")
+        return self.__emergency_stop_task
+
+    async def stop_emergency_stop_task(self):
+        """Stop the emergency stop monitoring task."""
+        task = self.__emergency_stop_task
+        self.__emergency_stop_loop = None
+        self.__emergency_stop_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
     def is_emergency_stop_thread_running(self) -> bool:
-        """Check if the emergency stop thread is running."""
-        with self.__emergency_stop_lock:
-            return self.__emergency_stop_running and self.__emergency_stop_thread is not None and self.__emergency_stop_thread.is_alive()
+        """Check if the emergency stop thread is running.
+
+        Reads without taking the lock; the result may lag a concurrent start or stop by one scheduler tick.
+        """
+        # __emergency_stop_thread 只在 start/stop 中持鎖修改，此處讀取參照本身即為原子操作
+        thread = self.__emergency_stop_thread
+        return thread is not None and thread.is_alive()
     
     def __del__(self):
         """Destructor to ensure emergency stop thread is properly stopped."""
         self.__stop_emergency_stop_thread(True)
+        self.__motion_executor.shutdown(wait=False, cancel_futures=True)
+        if self.__emergency_stop_eventfd is not None:
+            os.close(self.__emergency_stop_eventfd)
+        else:
+            for sock in self.__emergency_stop_sockets:
+                sock.close()
     
-    def set_motor_enabled(self, enabled: bool):
-        """Set the motor enabled.
-        
+    def __getattr__(self, name: str):
+        """Forward the Tmc220x methods the wrapper does not override to the wrapped stepper.
+
         Args:
-            enabled (bool): True to enable the motor, False to disable the motor.
-        """
-        self.__stepper.set_motor_enabled(enabled)
+            name (str): The attribute name.
+        """
+        # 僅在一般屬性查找失敗時呼叫；__stepper 尚未設定時 (例如 __init__ 失敗) 避免遞迴
+        try:
+            stepper = self.__dict__['_Tmc220xStepperWrapper__stepper']
+        except KeyError:
+            raise AttributeError(name) from None
+
+        attr = getattr(stepper, name)
+        if callable(attr):
+            # 快取綁定方法，之後的呼叫不再經過 __getattr__
+            self.__dict__[name] = attr
+        return attr
     
-    # Tmc220x methods
+    # Status methods
     # ----------------------------
-    def read_steps_per_rev(self) -> int:
-        """returns how many steps are needed for one revolution.
-        this reads the value from the tmc driver.
-
-        Returns:
-            int: Steps per revolution
-        """
-        return self.__stepper.read_steps_per_rev()
-
-    def read_drv_status(self) -> DrvStatus:
-        """read the register Adress "DRV_STATUS" and logs the reg valuess
-
-        Returns:
-            DRV_STATUS Register instance
-        """
-        return self.__stepper.read_drv_status()
-
-    def read_gconf(self) -> GConf:
-        """read the register Adress "GCONF" and logs the reg values
+    def read_status_bundle(self) -> TmcStatusBundle:
+        """Read DRV_STATUS, GCONF, GSTAT, IOIN and CHOPCONF back to back in one call.
 
         Returns:
-            GCONF Register instance
+            TmcStatusBundle: The five register instances.
         """
-        return self.__stepper.read_gconf()
-
-    def read_gstat(self) -> GStat:
-        """read the register Adress "GSTAT" and logs the reg values
-
-        Returns:
-            GSTAT Register instance
-        """
-        return self.__stepper.read_gstat()
-
-    def clear_gstat(self):
-        """clears the "GSTAT" register"""
-        self.__stepper.clear_gstat()
-
-    def read_ioin(self) -> Ioin:
-        """read the register Adress "IOIN" and logs the reg values
-
-        Returns:
-            IOIN Register instance
-        """
-        return self.__stepper.read_ioin()
-
-    def read_chopconf(self) -> ChopConf:
-        """read the register Adress "CHOPCONF" and logs the reg values
-
-        Returns:
-            CHOPCONF Register instance
-        """
-        return self.__stepper.read_chopconf()
-
-    def get_direction_reg(self) -> bool:
-        """returns the motor shaft direction: False = CCW; True = CW
-
-        Returns:
-            bool: motor shaft direction: False = CCW; True = CW
-        """
-        return self.__stepper.get_direction_reg()
-
-    def set_direction_reg(self, direction:bool):
-        """sets the motor shaft direction to the given value: False = CCW; True = CW
-
-        Args:
-            direction (bool): direction of the motor False = CCW; True = CW
-        """
-        self.__stepper.set_direction_reg(direction)
-
-    def get_iscale_analog(self) -> bool:
-        """return whether Vref (True) or 5V (False) is used for current scale
-
-        Returns:
-            en (bool): whether Vref (True) or 5V (False) is used for current scale
-        """
-        return self.__stepper.get_iscale_analog()
-
-    def set_iscale_analog(self,en:bool):
-        """sets Vref (True) or 5V (False) for current scale
-
-        Args:
-            en (bool): True=Vref, False=5V
-        """
-        self.__stepper.set_iscale_analog(en)
-
-    def get_vsense(self) -> bool:
-        """returns which sense resistor voltage is used for current scaling
-        False: Low sensitivity, high sense resistor voltage
-        True: High sensitivity, low sense resistor voltage
-
-        Returns:
-            bool: whether high sensitivity should is used
-        """
-        return self.__stepper.get_vsense()
-
-    def set_vsense(self,en:bool):
-        """sets which sense resistor voltage is used for current scaling
-        False: Low sensitivity, high sense resistor voltage
-        True: High sensitivity, low sense resistor voltage
-
-        Args:
-            en (bool):
-        """
-        self.__stepper.set_vsense(en)
-
-    def get_internal_rsense(self) -> bool:
-        """returns which sense resistor voltage is used for current scaling
-        False: Operation with external sense resistors
-        True Internal sense resistors. Use current supplied into
-        VREF as reference for internal sense resistor. VREF
-        pin internally is driven to GND in this mode.
-
-        Returns:
-            bool: which sense resistor voltage is used
-        """
-        return self.__stepper.get_internal_rsense()
-
-    def set_internal_rsense(self,en:bool):
-        """sets which sense resistor voltage is used for current scaling
-        False: Operation with external sense resistors
-        True: Internal sense resistors. Use current supplied into
-        VREF as reference for internal sense resistor. VREF
-        pin internally is driven to GND in this mode.
-
-        Args:
-        en (bool): which sense resistor voltage is used; true will propably destroy your tmc
-
-            """
-        self.__stepper.set_internal_rsense(en)
-
-    def set_current(self, run_current:int, hold_current_multiplier:float = 0.5,
-                    hold_current_delay:int = 10, pdn_disable:bool = True):
-        """sets the current flow for the motor.
-
-        Args:
-        run_current (int): current during movement in mA
-        hold_current_multiplier (int):current multiplier during standstill (Default value = 0.5)
-        hold_current_delay (int): delay after standstill after which cur drops (Default value = 10)
-        pdn_disable (bool): should be disabled if UART is used (Default value = True)
-
-        """
-        self.__stepper.set_current(run_current, hold_current_multiplier, hold_current_delay, pdn_disable)
-
-    def get_spreadcycle(self) -> bool:
-        """reads spreadcycle
-
-        Returns:
-            bool: True = spreadcycle; False = stealthchop
-        """
-        return self.__stepper.get_spreadcycle()
-
-    def set_spreadcycle(self,en:bool):
-        """enables spreadcycle (1) or stealthchop (0)
-
-        Args:
-        en (bool): true to enable spreadcycle; false to enable stealthchop
-
-        """
-        self.__stepper.set_spreadcycle(en)
-
-    def get_interpolation(self) -> bool:
-        """return whether the tmc inbuilt interpolation is active
-
-        Returns:
-            en (bool): true if internal µstep interpolation is enabled
-        """
-        return self.__stepper.get_interpolation()
-
-    def set_interpolation(self, en:bool):
-        """enables the tmc inbuilt interpolation of the steps to 256 µsteps
-
-        Args:
-            en (bool): true to enable internal µstep interpolation
-        """
-        self.__stepper.set_interpolation(en)
-
-    def get_toff(self) -> int:
-        """returns the TOFF register value
+        # TMC2209 的 UART 為半雙工單線，回應未收完前不能送出下一個請求，故仍依序讀取
+        stepper = self.__stepper
+        return TmcStatusBundle(stepper.read_drv_status(), stepper.read_gconf(), stepper.read_gstat(), stepper.read_ioin(), stepper.read_chopconf())
 
-        Returns:
-            int: TOFF register value
-        """
-        return self.__stepper.get_toff()
-
-    def set_toff(self, toff:int):
-        """Sets TOFF register to value
-
-        Args:
-            toff (uint8_t): value of toff (must be a four-bit value)
-        """
-        self.__stepper.set_toff(toff)
-
-    def read_microstepping_resolution(self) -> int:
-        """returns the current native microstep resolution (1-256)
-        this reads the value from the driver register
-
-        Returns:
-            int: µstep resolution
-        """
-        return self.__stepper.read_microstepping_resolution()
-
-    def get_microstepping_resolution(self) -> int:
-        """returns the current native microstep resolution (1-256)
-        this returns the cached value from this module
-
-        Returns:
-            int: µstep resolution
-        """
-        return self.__stepper.get_microstepping_resolution()
-
-    def set_microstepping_resolution(self, mres:int):
-        """sets the current native microstep resolution (1,2,4,8,16,32,64,128,256)
-
-        Args:
-            mres (int): µstep resolution; has to be a power of 2 or 1 for fullstep
-        """
-        self.__stepper.set_microstepping_resolution(mres)
-
-    def set_mstep_resolution_reg_select(self, en:bool):
-        """sets the register bit "mstep_reg_select" to 1 or 0 depending to the given value.
-        this is needed to set the microstep resolution via UART
-        this method is called by "set_microstepping_resolution"
-
-        Args:
-            en (bool): true to set µstep resolution via UART
-        """
-        self.__stepper.set_mstep_resolution_reg_select(en)
-
-    def get_interface_transmission_counter(self) -> int:
-        """reads the interface transmission counter from the tmc register
-        this value is increased on every succesfull write access
-        can be used to verify a write access
-
-        Returns:
-            int: 8bit IFCNT Register
-        """
-        return self.__stepper.get_interface_transmission_counter()
-
-    def get_tstep(self) -> int:
-        """reads the current tstep from the driver register
-
-        Returns:
-            int: TStep time
-        """
-        return self.__stepper.get_tstep()
-
-    def set_tpwmthrs(self, tpwmthrs: int):
-        """sets the current tpwmthrs
-
-        Args:
-            tpwmthrs (int): value for tpwmthrs
-        """
-        self.__stepper.set_tpwmthrs(tpwmthrs)
-
-    def set_vactual(self, vactual:int):
-        """sets the register bit "VACTUAL" to to a given value
-        VACTUAL allows moving the motor by UART control.
-        It gives the motor velocity in +-(2^23)-1 [μsteps / t]
-        0: Normal operation. Driver reacts to STEP input
-
-        Args:
-            vactual (int): value for VACTUAL
-        """
-        self.__stepper.set_vactual(vactual)
-
-    def get_microstep_counter(self) -> int:
-        """returns the current Microstep counter.
-        Indicates actual position in the microstep table for CUR_A
-
-        Returns:
-            int: current Microstep counter
-        """
-        return self.__stepper.get_microstep_counter()
-
-    def get_microstep_counter_in_steps(self, offset:int=0) -> int:
-        """returns the current Microstep counter.
-        Indicates actual position in the microstep table for CUR_A
-
-        Args:
-            offset (int): offset in steps (Default value = 0)
-
-        Returns:
-            step (int): current Microstep counter convertet to steps
-        """
-        return self.__stepper.get_microstep_counter_in_steps(offset)
-
-    # Test methods
+    # Motion methods
     # ----------------------------
-    def test_pin(self, pin, ioin_reg_bp):
-        """tests one pin
-
-        this function checks the connection to a pin
-        by toggling it and reading the IOIN register
-        """
-
-        return self.__stepper.test_pin(pin, ioin_reg_bp)
-
-    def test_dir_step_en(self):
-        """tests the EN, DIR and STEP pin
-
-        this sets the EN, DIR and STEP pin to HIGH, LOW and HIGH
-        and checks the IOIN Register of the TMC meanwhile
-        """
-        # test each pin on their own
-        return self.__stepper.test_dir_step_en()
-
-    def test_com(self):
-        """test method"""
-        return self.__stepper.test_com()
-
     def stop(self):
         """Stop the motor."""
-        self.__stepper.tmc_mc.stop()
-
-    def run_to_position_steps(self, steps, movement_abs_rel:MovementAbsRel = None) -> StopMode:
-        """Run to target position. Blocks the code until finished or stopped from a different thread!
-
-        Args:
-            steps: The number of steps to move.
-            movement_abs_rel: The absolute or relative movement.
-
-        Returns:
-            StopMode: The stop mode.
-        """
-        return self.__stepper.run_to_position_steps(steps, movement_abs_rel)
-
-    def run_to_position_fullsteps(self, steps, movement_abs_rel:MovementAbsRel = None) -> StopMode:
-        """Run to target position. Blocks the code until finished or stopped from a different thread!
-
-        Args:
-            steps: The number of steps to move.
-            movement_abs_rel: The absolute or relative movement.
-
-        Returns:
-            StopMode: The stop mode.
-        """
-        return self.__stepper.run_to_position_fullsteps(steps, movement_abs_rel)
-
-    def run_to_position_revolutions(self, revs, movement_abs_rel:MovementAbsRel = None) -> StopMode:
-        """Run to target position. Blocks the code until finished or stopped from a different thread!
-
-        Args:
-            revs: The number of revolutions to move.
-            movement_abs_rel: The absolute or relative movement.
-
-        Returns:
-            StopMode: The stop mode.
-        """
-        return self.__stepper.run_to_position_revolutions(revs, movement_abs_rel)
+        self.__mc.stop()
 
     async def run_to_position_steps_async(self, steps, movement_abs_rel:MovementAbsRel = None) -> StopMode:
         """
-        Run to target position in a background thread and await completion.
+        Run to target position on the motion thread and await completion.
 
         Args:
             steps: The number of steps to move.
@@ -472,11 +231,11 @@ class Tmc220xStepperWrapper:
         Returns:
             StopMode: The stop mode.
         """
-        return await asyncio.to_thread(self.__stepper.run_to_position_steps, steps, movement_abs_rel)
+        return await self.__run_to_position_async(self.__stepper.run_to_position_steps, steps, movement_abs_rel)
 
     async def run_to_position_fullsteps_async(self, steps, movement_abs_rel:MovementAbsRel = None) -> StopMode:
         """
-        Run to target position in a background thread and await completion.
+        Run to target position on the motion thread and await completion.
 
         Args:
             steps: The number of steps to move.
@@ -485,46 +244,108 @@ class Tmc220xStepperWrapper:
         Returns:
             StopMode: The stop mode.
         """
-        
-        return await asyncio.to_thread(self.__stepper.run_to_position_fullsteps, steps, movement_abs_rel)
+        return await self.__run_to_position_async(self.__stepper.run_to_position_fullsteps, steps, movement_abs_rel)
 
     async def run_to_position_revolutions_async(self, revs, movement_abs_rel:MovementAbsRel = None) -> StopMode:
         """
-        Run to target position in a background thread and await completion.
+        Run to target position on the motion thread and await completion.
 
         Args:
-            steps: The number of steps to move.
+            revs: The number of revolutions to move.
             movement_abs_rel: The absolute or relative movement.
 
         Returns:
             StopMode: The stop mode.
         """
+        return await self.__run_to_position_async(self.__stepper.run_to_position_revolutions, revs, movement_abs_rel)
 
-        return await asyncio.to_thread(self.__stepper.run_to_position_revolutions, revs, movement_abs_rel)
+    async def __run_to_position_async(self, run_to_position, amount, movement_abs_rel:MovementAbsRel) -> StopMode:
+        """Run one of the blocking run_to_position_* methods on the motion thread.
+
+        The motion executor has a single worker, so concurrent moves from the same wrapper run one after another in submission order.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__motion_executor, run_to_position, amount, movement_abs_rel)
 
     def __stop_emergency_stop_thread(self, due_to_destructor: bool = False):
         """Stop the emergency stop monitoring thread."""
-        self.__stepper.logger.info("Stopping emergency stop thread.", Loglevel.WARNING if due_to_destructor else Loglevel.INFO)
+        self.__logger.info("Stopping emergency stop thread.", Loglevel.WARNING if due_to_destructor else Loglevel.INFO)
 
+        # 清除執行緒參照即為停止訊號，工作執行緒被喚醒後發現自己已不是目前的執行緒便結束
         with self.__emergency_stop_lock:
-            if self.__emergency_stop_running:
-                self.__emergency_stop_running = False
-                self.__emergency_stop_event.set()  # Wake up the thread
+            thread = self.__emergency_stop_thread
+            self.__emergency_stop_thread = None
+        self.__wake_emergency_stop_thread()  # 喚醒等待中的執行緒
         
-        if self.__emergency_stop_thread and self.__emergency_stop_thread.is_alive():
-            self.__emergency_stop_thread.join(timeout=1.0)
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=1.0)
+
+    def __prioritize_emergency_stop_thread(self, thread: threading.Thread):
+        """Pin the emergency stop thread to the last CPU and give it SCHED_FIFO priority on Linux.
+
+        Raising the scheduling policy needs CAP_SYS_NICE (or root); without it the thread keeps the default policy.
+        """
+        if not hasattr(os, 'sched_setaffinity'):
+            return
+
+        try:
+            # 多核心時將急停執行緒固定於最後一個核心，與主執行緒及相機串流分開
+            cpus = os.sched_getaffinity(0)
+            if len(cpus) > 1:
+                os.sched_setaffinity(thread.native_id, {max(cpus)})
+            os.sched_setscheduler(thread.native_id, os.SCHED_FIFO, os.sched_param(50))
+        except OSError as e:
+            self.__tmc_logger.log(f"Could not raise emergency stop thread priority: {e}", Loglevel.WARNING)
+
+    def __wake_emergency_stop_thread(self):
+        """Wake the emergency stop thread with a single write to the wakeup fd."""
+        try:
+            if self.__emergency_stop_eventfd is not None:
+                os.eventfd_write(self.__emergency_stop_eventfd, 1)
+            else:
+                self.__emergency_stop_sockets[1].send(b'\x00')
+        except BlockingIOError:
+            # 緩衝區已滿代表已有未處理的喚醒
+            pass
+
+    def __wait_emergency_stop_wakeup(self):
+        """Block until the wakeup fd is written, then drain it."""
+        if self.__emergency_stop_eventfd is not None:
+            readable = self.__emergency_stop_eventfd
+            drain = lambda: os.eventfd_read(self.__emergency_stop_eventfd)
+        else:
+            readable = self.__emergency_stop_sockets[0]
+            drain = lambda: self.__emergency_stop_sockets[0].recv(512)
+
+        select.select([readable], [], [])
+        try:
+            drain()
+        except BlockingIOError:
+            pass
+
+    async def __emergency_stop_task_worker(self):
+        """Coroutine counterpart of __emergency_stop_thread_worker."""
+        while True:
+            await self.__emergency_stop_aio_event.wait()
+            self.__emergency_stop_aio_event.clear()
+            if self.__emergency_stop_triggered:
+                self.__emergency_stop_triggered = False
+                # 不可使用 motion executor：移動指令可能正佔用該執行緒
+                await asyncio.to_thread(self.emergency_stop)
 
     def __emergency_stop_thread_worker(self):
         """Worker function for the emergency stop thread."""
-        while self.__emergency_stop_running:
+        current_thread = threading.current_thread()
+        while self.__emergency_stop_thread is current_thread:
 
             try:
-                # Wait for emergency event with timeout to allow checking running flag
-                if self.__emergency_stop_event.wait(timeout = 0.05):
-                    with self.__emergency_stop_lock:
-                        self.emergency_stop()
+                # 阻塞至觸發急停或停止執行緒，不再定期喚醒
+                self.__wait_emergency_stop_wakeup()
+
+                if self.__emergency_stop_triggered:
+                    self.__emergency_stop_triggered = False
+                    self.emergency_stop()
 
             except Exception as e:
                 self.emergency_stop()
-                self.__stepper.logger.log(f"Error in emergency stop thread: {e}. Motor is disabled.", Loglevel.ERROR)
+                self.__logger.log(f"Error in emergency stop thread: {e}. Motor is disabled.", Loglevel.ERROR)
                 raise
\ No newline at end of file
@@ -1,53 +1,117 @@
+import contextlib
 import torch
+import torch.utils.checkpoint
 from torch.nn import Module, Linear
 from torchvision.models import resnet18
-from torchvision import transforms
-from torchvision.transforms import Compose, Normalize
 from torchvision.models.resnet import ResNet
 from torch.nn import Sequential, ReLU
 
 
 class GratingRotationPredictorWithFftResnet18(Module):
 
-    def __init__(self):
+    def __init__(self, autocast_dtype: torch.dtype | None = None, gradient_checkpointing: bool = False):
+        """
+        Parameter:
+            autocast_dtype: if set (e.g. torch.bfloat16), the backbone and the head run under autocast with this dtype.
+                If None, an autocast region opened by the caller (e.g. the training loop) applies unchanged.
+                The fft always runs in float32.
+            gradient_checkpointing: if True, the backbone activations are not kept for backward during training
+                but recomputed, trading one extra backbone forward for memory.
+        """
 
         super().__init__()
 
-        self.__grayscale_to_3channel_transform: Compose = Compose([
-            transforms.Grayscale(num_output_channels = 3),
-            Normalize(mean = [0.485, 0.456, 0.406], std = [0.229, 0.224, 0.225])
-        ])
+        self.autocast_dtype: torch.dtype | None = autocast_dtype
+        self.gradient_checkpointing: bool = gradient_checkpointing
+        self.__compiled_forward = None
+        # 推論時重複使用的串接特徵緩衝區，不屬於 state_dict
+        self.__concat_feature_buffer: torch.Tensor | None = None
 
-        self.__resnet18_rgb_feature_extractor: ResNet = resnet18(weights = None)
-        self.__resnet18_rgb_feature_extractor.fc = Linear(self.__resnet18_rgb_feature_extractor.fc.in_features, self.__resnet18_rgb_feature_extractor.fc.in_features // 2)
+        # 影像與 fft 兩個分支共用同一個 backbone，兩者沿 batch 維度串接後一次推論
+        self.__resnet18_feature_extractor: ResNet = resnet18(weights = None)
+        self.__resnet18_feature_extractor.fc = Linear(self.__resnet18_feature_extractor.fc.in_features, self.__resnet18_feature_extractor.fc.in_features // 2)
 
-        # convert the image into grayscale image and perform fft
-        # fft result is converted into a 3-channel tensor
-        # the first channel is the magnitude, the second channel is the angle, the third channel is the real part
-        self.__fft_transform: Compose = Compose([
-            transforms.Grayscale(num_output_channels = 1),
-            transforms.Lambda(lambda x: torch.fft.rfft2(x, norm = "ortho")),
-            transforms.Lambda(lambda x: torch.stack((x.abs(), x.angle(), x.real), dim = 1).squeeze())
-        ])
-
-        self.__resnet18_fft_feature_extractor: ResNet = resnet18(weights = None)
-        self.__resnet18_fft_feature_extractor.fc = Linear(self.__resnet18_fft_feature_extractor.fc.in_features, self.__resnet18_fft_feature_extractor.fc.in_features // 2)
+        # 與 torchvision rgb_to_grayscale 相同的權重，forward 以單次 einsum 轉成灰階，兩個分支共用
+        self.register_buffer("_grayscale_weights", torch.tensor([0.2989, 0.587, 0.114]), persistent = False)
+        # ImageNet 的 Normalize 改寫成 x * (1 / std) + (-mean / std)，與展開成 3 通道合併為單一 addcmul
+        mean: torch.Tensor = torch.tensor([0.485, 0.456, 0.406]).reshape(1, 3, 1, 1)
+        std: torch.Tensor = torch.tensor([0.229, 0.224, 0.225]).reshape(1, 3, 1, 1)
+        self.register_buffer("_normalize_scale", 1 / std, persistent = False)
+        self.register_buffer("_normalize_bias", -mean / std, persistent = False)
 
         # Concatenation layers
         self.__concat_transform = Sequential(
-            Linear(self.__resnet18_rgb_feature_extractor.fc.in_features // 2 + self.__resnet18_fft_feature_extractor.fc.in_features // 2, 512),
+            Linear(self.__resnet18_feature_extractor.fc.out_features * 2, 512),
+            ReLU(inplace = True),
             Linear(512, 256),
+            ReLU(inplace = True),
             Linear(256, 128),
+            ReLU(inplace = True),
             Linear(128, 1)
         )
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
 
-        rgb_feature:torch.Tensor = self.__resnet18_rgb_feature_extractor(self.__grayscale_to_3channel_transform(x))
-        fft_feature:torch.Tensor = self.__resnet18_fft_feature_extractor(self.__fft_transform(x))
+        batch_size: int = x.shape[0]
+        grayscale: torch.Tensor = torch.einsum("nchw,c->nhw", x, self._grayscale_weights)
+        # 單通道灰階廣播到 3 通道並同時正規化，只讀寫一次完整的輸入
+        image_input: torch.Tensor = torch.addcmul(self._normalize_bias, grayscale.unsqueeze(1), self._normalize_scale)
+        fft_input: torch.Tensor = self.__fft_transform(grayscale)
+
+        # 未指定 autocast_dtype 時不可開 enabled=False 的 autocast，否則會關掉呼叫端的 autocast
+        autocast_context = torch.autocast(device_type = x.device.type, dtype = self.autocast_dtype) if self.autocast_dtype is not None else contextlib.nullcontext()
+        with autocast_context:
+            backbone_input: torch.Tensor = torch.cat((image_input, fft_input), dim = 0)
+            # 模型轉成 channels_last 時，backbone 輸入也使用相同的記憶體排列，避免 cuDNN 每次轉換
+            if self.__resnet18_feature_extractor.conv1.weight.is_contiguous(memory_format = torch.channels_last):
+                backbone_input = backbone_input.contiguous(memory_format = torch.channels_last)
+            if self.gradient_checkpointing and self.training:
+                features: torch.Tensor = torch.utils.checkpoint.checkpoint(self.__resnet18_feature_extractor, backbone_input, use_reentrant = False)
+            else:
+                features: torch.Tensor = self.__resnet18_feature_extractor(backbone_input)
+
+            # 前半為影像分支的特徵，後半為 fft 分支的特徵
+            # out= 不支援 autograd；編譯時由 Inductor 自行規劃記憶體，因此只在 eager 推論時寫入持久緩衝區
+            if torch.is_grad_enabled() or torch._dynamo.is_compiling():
+                concat_feature:torch.Tensor = torch.cat((features[:batch_size], features[batch_size:]), dim = 1)
+            else:
+                concat_feature:torch.Tensor = torch.cat((features[:batch_size], features[batch_size:]), dim = 1, out = self.__concat_buffer(features, batch_size))
+            return self.__concat_transform(concat_feature)
+
+    def compile_for_inference(self, example_input: torch.Tensor) -> None:
+        """
+        Compile forward for the fixed shape of example_input (the camera resolution does not change after
+        initialization) and run it once, so compilation and autotuning happen here instead of on the first frame.
+        Only predict uses the compiled graph; training keeps calling the eager forward.
+        """
+        self.eval()
+        self.__compiled_forward = torch.compile(self.forward, fullgraph = True, dynamic = False, mode = "max-autotune")
+        with torch.inference_mode():
+            self.__compiled_forward(example_input)
 
-        concat_feature:torch.Tensor = torch.hstack((rgb_feature, fft_feature))
+    @torch.inference_mode()
+    def predict(self, x: torch.Tensor) -> torch.Tensor:
+        """Run inference, through the compiled graph if compile_for_inference was called"""
+        forward = self.forward if self.__compiled_forward is None else self.__compiled_forward
+        return forward(x)
 
-        del rgb_feature, fft_feature
+    def __concat_buffer(self, features: torch.Tensor, batch_size: int) -> torch.Tensor:
+        """Return the [N, 2F] buffer for the concatenated features, reallocating it when the shape, device, dtype or inference mode changes"""
+        shape = torch.Size((batch_size, features.shape[1] * 2))
+        buffer: torch.Tensor | None = self.__concat_feature_buffer
+        if buffer is None or buffer.shape != shape or buffer.device != features.device or buffer.dtype != features.dtype \
+                or buffer.is_inference() != torch.is_inference_mode_enabled():
+            buffer = self.__concat_feature_buffer = torch.empty(shape, device = features.device, dtype = features.dtype)
+        return buffer
 
-        return self.__concat_transform(concat_feature)
\ No newline at end of file
+    def __fft_transform(self, grayscale: torch.Tensor) -> torch.Tensor:
+        """
+        Perform fft on the [N, H, W] grayscale image batch.
+        The fft result is converted into a 3-channel tensor of shape [N, 3, H, W], the same shape as the image
+        so both can share one backbone batch: the first channel is the magnitude, the second channel is the angle,
+        the third channel is the real part.
+        Runs in float32 even under an outer autocast: cuFFT only supports half precision for power-of-two sizes.
+        """
+        with torch.autocast(device_type = grayscale.device.type, enabled = False):
+            spectrum: torch.Tensor = torch.fft.fft2(grayscale.float(), norm = "ortho")
+        return torch.stack((spectrum.abs(), spectrum.angle(), spectrum.real), dim = 1)
\ No newline at end of file
@@ -1,10 +1,12 @@
+import json
 import torch
+import numpy as np
 import pandas as pd
 import logging
 import torchvision.io as io
 from pathlib import Path
 from torch.utils.data import Dataset
-from torchvision.transforms import Compose
+from torchvision.transforms.v2 import Compose
 from typing import NamedTuple, List, Tuple
 
 class GratingPostureInfo(NamedTuple):
@@ -17,7 +19,16 @@ class GratingPostureInfo(NamedTuple):
 
 class RotatedGartingImageDataset(Dataset):
 
-    def __init__(self, root_dir: str, excel_file_path: str | Path, transform: Compose | None = None, image_extension: str = "png", logger: logging.Logger | None = None):
+    def __init__(self, root_dir: str, excel_file_path: str | Path, transform: Compose | None = None, image_extension: str = "png", logger: logging.Logger | None = None,
+                 preprocess: Compose | None = None, image_cache_path: str | Path | None = None):
+        """
+        Parameter:
+            preprocess: deterministic transforms (e.g. Resize, Grayscale) producing uint8 images of a fixed shape.
+                With image_cache_path they run once per image and the results are stored in a .npy file that is
+                memory mapped afterwards; transform then only runs the random part on every access.
+            image_cache_path: where to store the preprocessed images. A .json key next to it records the Excel file's
+                mtime, the newest image file's mtime and the repr of preprocess; the cache is rebuilt when any of them changes.
+        """
 
         excel_file_path: Path = Path(excel_file_path)
         root_dir: Path = Path(root_dir)
@@ -35,25 +46,40 @@ class RotatedGartingImageDataset(Dataset):
 
         self.__root_dir: Path = Path(root_dir)
         self.__excel_file_path: Path = excel_file_path
-        self.__grating_posture_info: List[GratingPostureInfo] = self.__load_excel_file(excel_file_path, self.__logger)
-        self.__image_paths: List[Path] = [self.__root_dir / f"{info.image_id}.{image_extension}" for info in self.__grating_posture_info]
+        # 每個欄位存成一個 1-D tensor，__getitem__ 只做索引，不必為每列配置多個純量 tensor
+        self.__grating_posture_columns: GratingPostureInfo = self.__load_excel_file(excel_file_path, self.__logger)
+        # 以固定寬度的 numpy 字串陣列儲存路徑：list[str] 中每個字串都是獨立的 Python 物件，worker 讀取時更新參考計數
+        # 會觸發 copy-on-write，使每個 worker 各複製一份；numpy 陣列只有一個物件，資料頁面可在行程間共用
+        self.__image_paths: np.ndarray = np.array([str(self.__root_dir / f"{image_id}.{image_extension}") for image_id in self.__grating_posture_columns.image_id.tolist()])
         self.__transform: Compose | None = transform
+        self.__preprocess: Compose | None = preprocess
+        self.__image_cache_path: Path | None = Path(image_cache_path) if image_cache_path is not None and preprocess is not None else None
+        # 每個行程各自開啟 memmap，DataLoader worker 以 spawn 啟動時不會把整個陣列序列化過去
+        self.__cached_images: np.ndarray | None = None
+        if self.__image_cache_path is not None:
+            self.__build_image_cache()
 
     def __len__(self) -> int:
-        return len(self.__grating_posture_info)
+        return len(self.__image_paths)
 
     def __getitem__(self, index: int) -> Tuple[torch.Tensor, GratingPostureInfo]:
 
-        image_path: Path = self.__image_paths[index]
-        image: torch.Tensor = io.read_image(image_path)
+        if self.__image_cache_path is not None:
+            if self.__cached_images is None:
+                self.__cached_images = np.load(self.__image_cache_path, mmap_mode = "r")
+            image: torch.Tensor = torch.from_numpy(np.array(self.__cached_images[index]))
+        else:
+            image: torch.Tensor = io.read_image(self.__image_paths[index])
+            if self.__preprocess:
+                image = self.__preprocess(image)
         if self.__transform:
             image = self.__transform(image)
 
-        return image, self.__grating_posture_info[index]
+        return image, GratingPostureInfo._make(column[index] for column in self.__grating_posture_columns)
 
     @property
     def grating_posture_info(self) -> List[GratingPostureInfo]:
-        return self.__grating_posture_info
+        return [GratingPostureInfo._make(row) for row in zip(*self.__grating_posture_columns)]
 
     @property
     def root_dir(self) -> Path:
@@ -67,31 +93,87 @@ class RotatedGartingImageDataset(Dataset):
     def transform(self, transform: Compose | None):
         self.__transform = transform
 
+    def __image_cache_key(self) -> dict:
+        """Describe the inputs of the image cache: the Excel file, the newest image file and the preprocess transforms"""
+        return {
+            "excel_mtime_ns": self.__excel_file_path.stat().st_mtime_ns,
+            "image_count": len(self.__image_paths),
+            # 只更換影像檔而未修改 Excel 檔時也要重建快取
+            "newest_image_mtime_ns": max(Path(image_path).stat().st_mtime_ns for image_path in self.__image_paths.tolist()),
+            # v2 轉換的 repr 包含尺寸、插值方式與 antialias 等參數，輸出尺寸不變但參數改變時快取同樣失效
+            "preprocess": repr(self.__preprocess),
+        }
+
+    def __build_image_cache(self) -> None:
+        """Run preprocess on every image once and store the uint8 results in the .npy cache, unless a valid cache exists"""
+        cache_path: Path = self.__image_cache_path
+        key_path: Path = cache_path.with_name(cache_path.name + ".json")
+        cache_key: dict = self.__image_cache_key()
+        try:
+            if json.loads(key_path.read_text(encoding = "utf-8")) == cache_key:
+                # mmap_mode 只讀取 .npy 標頭，不必解碼任何影像即可檢查形狀
+                cached: np.ndarray = np.load(cache_path, mmap_mode = "r")
+                is_valid: bool = cached.dtype == np.uint8 and cached.shape[0] == len(self.__image_paths)
+                # 先釋放映射，Windows 上映射中的檔案無法被取代
+                del cached
+                if is_valid:
+                    self.__logger.debug(f"Using cached preprocessed images: {cache_path}")
+                    return
+        except (OSError, ValueError) as e:
+            self.__logger.debug(f"Cannot read cached images {cache_path}: {e}")
+
+        first_image: torch.Tensor = self.__preprocess(io.read_image(self.__image_paths[0]))
+        expected_shape: Tuple[int, ...] = (len(self.__image_paths), *first_image.shape)
+        self.__logger.info(f"Preprocessing {expected_shape[0]} images into {cache_path}")
+        # 先寫入暫存檔再改名，中斷時不會留下不完整的快取
+        temp_path: Path = cache_path.with_name(cache_path.name + ".tmp")
+        images: np.ndarray = np.lib.format.open_memmap(temp_path, mode = "w+", dtype = np.uint8, shape = expected_shape)
+        images[0] = first_image.numpy()
+        for index in range(1, expected_shape[0]):
+            images[index] = self.__preprocess(io.read_image(self.__image_paths[index])).numpy()
+        images.flush()
+        del images
+        # 取代快取前先刪除舊鍵、完成後才寫入新鍵，中途中斷時下次必定重新建立
+        key_path.unlink(missing_ok = True)
+        temp_path.replace(cache_path)
+        key_path.write_text(json.dumps(cache_key), encoding = "utf-8")
+
     @staticmethod
-    def __load_excel_file(excel_file_path: Path, logger: logging.Logger | None = None) -> List[GratingPostureInfo]:
+    def __load_excel_file(excel_file_path: Path, logger: logging.Logger | None = None) -> GratingPostureInfo:
         """
-        Load Excel file and parse each row into a GratingData NamedTuple.
+        Load Excel file and convert each column into a 1-D tensor.
+        The parsed sheet is cached as a Parquet file next to the Excel file and reused while it is newer than
+        the Excel file. Without a Parquet engine (pyarrow or fastparquet) the Excel file is parsed every time.
         
         Returns:
-            List[GratingData]: List of GratingData objects, one for each row in the Excel file
+            GratingPostureInfo: one tensor per field, indexed by row
         """
-        # read Excel file
-        logger.debug(f"Loading excel file: {excel_file_path}")
-        df: pd.DataFrame = pd.read_excel(excel_file_path)
-        
-        # Parse each row into GratingData NamedTuple
-        grating_posture_info: List[GratingPostureInfo] = []
-        
-        for _, row in df.iterrows():
-            grating_info = GratingPostureInfo(
-                image_id = torch.as_tensor(row["image_id"], dtype = torch.int32),
-                gratering_side_x_cm = torch.as_tensor(row["gratering_side_x_cm"], dtype = torch.float32),
-                gratering_side_y_cm = torch.as_tensor(row["gratering_side_y_cm"], dtype = torch.float32),
-                gratering_side_angle_deg = torch.as_tensor(row["gratering_side_angle_deg"], dtype = torch.float32),
-                grating_side_rotation_deg = torch.as_tensor(row["grating_side_rotation_deg"], dtype = torch.float32)
-            )
-
-            logger.debug(f"Loaded grating posture info: {grating_info}")
-            grating_posture_info.append(grating_info)
+        df: pd.DataFrame | None = None
+        cache_path: Path = excel_file_path.with_suffix(".parquet")
+        try:
+            # 快取不存在時 stat 直接拋出 FileNotFoundError，不必先以 exists 多查一次
+            if cache_path.stat().st_mtime >= excel_file_path.stat().st_mtime:
+                logger.debug(f"Loading cached sheet: {cache_path}")
+                df = pd.read_parquet(cache_path)
+        except (ImportError, OSError, ValueError) as e:
+            logger.debug(f"Cannot read cached sheet {cache_path}: {e}")
+
+        if df is None:
+            # read Excel file
+            logger.debug(f"Loading excel file: {excel_file_path}")
+            df = pd.read_excel(excel_file_path)
+            try:
+                df.to_parquet(cache_path)
+            except (ImportError, OSError, ValueError) as e:
+                logger.debug(f"Cannot cache sheet to {cache_path}: {e}")
         
-        return grating_posture_info
\ No newline at end of file
+        grating_posture_columns = GratingPostureInfo(
+            image_id = torch.from_numpy(df["image_id"].to_numpy(dtype = np.int32)),
+            gratering_side_x_cm = torch.from_numpy(df["gratering_side_x_cm"].to_numpy(dtype = np.float32)),
+            gratering_side_y_cm = torch.from_numpy(df["gratering_side_y_cm"].to_numpy(dtype = np.float32)),
+            gratering_side_angle_deg = torch.from_numpy(df["gratering_side_angle_deg"].to_numpy(dtype = np.float32)),
+            grating_side_rotation_deg = torch.from_numpy(df["grating_side_rotation_deg"].to_numpy(dtype = np.float32))
+        )
+
+        logger.debug(f"Loaded {len(df)} grating posture info rows")
+        return grating_posture_columns
\ No newline at end of file
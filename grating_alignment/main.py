@@ -1,53 +1,40 @@
+import argparse
 import logging
-import os
 import sys
-import pypylon.pylon
 import json
-from typing import Tuple, List
-from logging import Handler, StreamHandler, FileHandler
-from dep.camerautils.Pylon.PylonCameraWrapper import PylonCameraWrapper
+from typing import TYPE_CHECKING, Any, Dict, List
 from dep.camerautils.PixelFormatEnum import PixelFormatEnum
-from shared.LoggingFormatter import ColoredLoggingFormatter
-
-def _initialize_logger(logger_name:str, log_to_console:bool = True, log_to_file:bool = False, log_level = logging.INFO) -> Tuple[logging.Logger, List[Handler]]:
-    logger:logging.Logger = logging.getLogger(logger_name)
-    logger.handlers.clear()
-    
-    console_handler: StreamHandler = StreamHandler()
-    handlers: List[Handler] = []
-    
-    console_handler.setFormatter(ColoredLoggingFormatter.instance())
-    console_handler.setLevel(log_level)
-    if log_to_console:
-        logger.addHandler(console_handler)
-        handlers.append(console_handler)
-    if log_to_file:
-        os.makedirs("logs", exist_ok = True)
-        file_handler: FileHandler = FileHandler(f"logs/{logger_name}.log")
-        file_handler.setFormatter(ColoredLoggingFormatter.instance())
-        file_handler.setLevel(log_level)
-        logger.addHandler(file_handler)
-        handlers.append(file_handler)
-    
-    logger.setLevel(log_level)
-    logger.propagate = False
-    return logger, handlers
-
-
-def _acquire_pylon_camera_wrapper(logger:logging.Logger) -> PylonCameraWrapper | None:
+from shared.LoggingUtils import ColoredConsoleLoggerFactorySingleton
+
+if TYPE_CHECKING:
+    from dep.camerautils.Pylon.PylonCameraWrapper import PylonCameraWrapper
+
+def _acquire_pylon_camera_wrapper(logger:logging.Logger) -> 'PylonCameraWrapper | None':
+    # 延遲載入 pypylon，--help 等不需要相機的路徑不必載入整個 SDK
+    import pypylon.pylon as pylon
+    from dep.camerautils.Pylon.PylonCameraWrapper import PylonCameraWrapper
 
     camera: PylonCameraWrapper | None = None
     try:
-        pylon_camera = pypylon.pylon.TlFactory.GetInstance().CreateFirstDevice()
+        pylon_camera = pylon.TlFactory.GetInstance().CreateFirstDevice()
         camera = PylonCameraWrapper(pylon_camera, PixelFormatEnum.BGR8, logger)
-    except pypylon.pylon.RuntimeException as e:
+    except pylon.RuntimeException as e:
         logger.error(f"Error initializing pylon camera: {e}")
 
     return camera
 
+def _process_command_line_args(argv: List[str]) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description = "Grating alignment camera application")
+    parser.add_argument("-v", "--llevel", type = int, default = logging.INFO, help = "Log level as a logging module integer, e.g. 10 for DEBUG")
+    return vars(parser.parse_args(argv))
+
 def main():
-    main_logger, _ = _initialize_logger(__name__, log_to_console = True)
-    pylon_logger, _ = _initialize_logger("pylon", log_to_console = True)
+    # 在初始化相機等耗時資源前先解析參數，--help 或參數錯誤時可立即結束
+    args: Dict[str, Any] = _process_command_line_args(sys.argv[1:])
+
+    logger_factory = ColoredConsoleLoggerFactorySingleton.instance()
+    main_logger, _ = logger_factory.get_logger(__name__, log_to_console = True, log_level = args["llevel"])
+    pylon_logger, _ = logger_factory.get_logger("pylon", log_to_console = True, log_level = args["llevel"])
 
     main_logger.info("Starting application...")
     camera: PylonCameraWrapper | None = _acquire_pylon_camera_wrapper(pylon_logger)
@@ -55,7 +42,8 @@ def main():
         sys.exit(1)
 
     camera.initialize_camera()
-    main_logger.info(json.dumps(camera.get_camera_info(), indent = 4))
+    if main_logger.isEnabledFor(logging.INFO):
+        main_logger.info("%s", json.dumps(camera.get_camera_info(), indent = 4))
     camera.start_camera_streaming()
 
 if __name__ == "__main__":
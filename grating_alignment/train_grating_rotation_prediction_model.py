@@ -1,17 +1,25 @@
+import contextlib
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 import logging
 import os
 import argparse
 import time
+from pathlib import Path
 from tqdm import tqdm
-from typing import Tuple, List
+from typing import Iterator, Tuple, List
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader, random_split
-from torchvision import transforms
+from torch.utils.data.distributed import DistributedSampler
+from torchvision.transforms import v2 as transforms
 from EstimateGratingRotation import GratingRotationPredictorWithFftResnet18
 from RotatedGartingImageDataset import RotatedGartingImageDataset
-from shared.LoggingFormatter import ColoredLoggingFormatter
+from shared.LoggingUtils import ColoredConsoleLoggerFactorySingleton
+
+# 前處理後輸入模型的影像尺寸 (H, W)
+_IMAGE_SIZE: Tuple[int, int] = (224, 224)
 
 def _create_data_loaders(
     root_dir: str,
@@ -19,15 +27,38 @@ def _create_data_loaders(
     batch_size: int = 32,
     train_split: float = 0.8,
     num_workers: int = 4,
-    logger: logging.Logger = None
+    logger: logging.Logger = None,
+    prefetch_factor: int = 4,
+    cache_images: bool = True,
+    val_pin_memory: bool = False,
+    val_persistent_workers: bool = False,
+    gpu_augmentation: bool = False,
+    distributed: bool = False
 ) -> Tuple[DataLoader, DataLoader]:
-    """Create train and validation data loaders"""
-    
+    """
+    Create train and validation data loaders.
+    With num_workers > 0 each worker keeps prefetch_factor batches ready. The train workers persist across epochs;
+    the validation loader only pins memory and keeps its workers when val_pin_memory / val_persistent_workers are set.
+    With cache_images the deterministic resize and grayscale run once and are cached next to the Excel file.
+    With gpu_augmentation the train loader only converts to float; the augmentation from _create_gpu_augmentation
+    runs on the batch in train_epoch.
+    With distributed each process trains on its own shard of the train split through a DistributedSampler;
+    every process still validates on the whole validation split.
+    """
+    
+    # 固定不變的前處理只做一次並快取，每個 epoch 只執行隨機的資料增強
+    preprocess = transforms.Compose([
+        transforms.Resize(_IMAGE_SIZE, antialias = True),
+        transforms.Grayscale(num_output_channels = 3),  # Convert grayscale to RGB
+    ])
+
     # Create dataset
     full_dataset = RotatedGartingImageDataset(
         root_dir=root_dir,
         excel_file_path=excel_file_path,
-        logger=logger
+        logger=logger,
+        preprocess=preprocess,
+        image_cache_path=Path(excel_file_path).with_suffix(".preprocessed.npy") if cache_images else None
     )
     
     # Split dataset
@@ -35,24 +66,20 @@ def _create_data_loaders(
     train_size = int(train_split * total_size)
     val_size = total_size - train_size
 
-        # Define transforms
+    # Define transforms
+    # read_image 已回傳 uint8 張量，v2 轉換直接在張量上運算，不需來回轉換 PIL 影像
     train_transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((224, 224)),
-        transforms.Grayscale(num_output_channels = 3),  # Convert grayscale to RGB
         transforms.RandomAffine(degrees = 10, translate = (0.1, 0.1), scale = (0.9, 1.1), shear = 10),
-        transforms.RandomEqualize(p = 0.5),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        transforms.RandomEqualize(p = 0.5),  # 需在 uint8 上執行
+        transforms.ToDtype(torch.float32, scale = True),
         transforms.RandomRotation(degrees = 10)
+    ]) if not gpu_augmentation else transforms.Compose([
+        transforms.ToDtype(torch.float32, scale = True),
     ])
 
+    # 模型在 forward 中自行正規化，這裡只轉成 [0, 1] 的 float，避免重複正規化
     test_transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((224, 224)),
-        transforms.Grayscale(num_output_channels = 3),  # Convert grayscale to RGB
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+        transforms.ToDtype(torch.float32, scale = True),
     ])
     
     train_dataset: torch.utils.data.subset.Subset
@@ -66,78 +93,200 @@ def _create_data_loaders(
     test_dataset.dataset.transform = test_transform
     
     # Create data loaders
-    train_loader = DataLoader(train_dataset, batch_size = batch_size, shuffle = True, num_workers = num_workers, pin_memory = True, persistent_workers = True)
-    test_loader = DataLoader(test_dataset, batch_size = batch_size, shuffle = False, num_workers = num_workers, pin_memory = True, persistent_workers = True)
+    # persistent_workers 與 prefetch_factor 只能在有 worker 時設定
+    train_worker_options: dict = dict(persistent_workers = True, prefetch_factor = prefetch_factor) if num_workers > 0 else {}
+    # 驗證只佔每個 epoch 的一小部分，預設不常駐 worker 也不使用 pinned memory，以節省記憶體
+    test_worker_options: dict = dict(persistent_workers = val_persistent_workers, prefetch_factor = prefetch_factor) if num_workers > 0 else {}
+    # 分散式訓練由 sampler 打亂並切分資料，DataLoader 本身不可再設定 shuffle
+    train_sampler: DistributedSampler | None = DistributedSampler(train_dataset, shuffle = True) if distributed else None
+    train_loader = DataLoader(train_dataset, batch_size = batch_size, shuffle = train_sampler is None, sampler = train_sampler, num_workers = num_workers, pin_memory = True, **train_worker_options)
+    test_loader = DataLoader(test_dataset, batch_size = batch_size, shuffle = False, num_workers = num_workers, pin_memory = val_pin_memory, **test_worker_options)
     
     return train_loader, test_loader
 
-def train_epoch(model: nn.Module, train_loader: DataLoader, optimizer: optim.Optimizer, criterion: nn.Module, device: str | torch.device) -> float:
-    """Train the model for one epoch"""
+def _create_gpu_augmentation(device: torch.device) -> nn.Module:
+    """
+    Build the train augmentation as Kornia modules running on the whole batch on device.
+    Same steps as the CPU train transform; expects float images in [0, 1] and keeps that range, the model normalizes
+    them itself. Raises ImportError without kornia.
+    """
+    import kornia.augmentation as K
+
+    # Kornia 的 RandomAffine 與 RandomRotation 預設 p=0.5，torchvision 版本則每次都套用
+    return nn.Sequential(
+        K.RandomAffine(degrees = 10, translate = (0.1, 0.1), scale = (0.9, 1.1), shear = 10, p = 1.0),
+        K.RandomEqualize(p = 0.5),
+        K.RandomRotation(degrees = 10, p = 1.0),
+    ).to(device)
+
+def _compile_model(model: nn.Module, device: torch.device, batch_size: int, amp_dtype: torch.dtype | None, logger: logging.Logger) -> nn.Module:
+    """
+    Compile model with torch.compile and run one training step and one validation forward on a random batch.
+    torch.compile is lazy, so the warm-up makes compile errors surface here; the model is returned uncompiled if they do.
+    The warm-up's gradients are cleared and the buffers it changed (batch norm statistics) are restored.
+    """
+    saved_buffers: dict[str, torch.Tensor] = {name: buffer.detach().clone() for name, buffer in model.named_buffers()}
+    images: torch.Tensor = torch.rand(batch_size, 3, *_IMAGE_SIZE, device = device)
+    try:
+        compiled_model: nn.Module = torch.compile(model, mode = "reduce-overhead", fullgraph = False)
+        # 訓練與驗證各編譯一個圖，兩者都先執行一次
+        compiled_model.train()
+        with torch.autocast(device_type = device.type, dtype = amp_dtype, enabled = amp_dtype is not None):
+            outputs: torch.Tensor = compiled_model(images)
+        outputs.float().square().mean().backward()
+        compiled_model.eval()
+        with torch.no_grad(), torch.autocast(device_type = device.type, dtype = amp_dtype, enabled = amp_dtype is not None):
+            compiled_model(images)
+        logger.info("Model compiled with torch.compile")
+        return compiled_model
+    except Exception as e:
+        logger.warning("torch.compile failed, training eagerly: %s", e)
+        return model
+    finally:
+        model.zero_grad(set_to_none = True)
+        with torch.no_grad():
+            for name, buffer in model.named_buffers():
+                buffer.copy_(saved_buffers[name])
+
+def _iterate_on_device(data_loader: DataLoader, device: str | torch.device) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+    """
+    Yield (images, targets) batches already moved to device.
+    On CUDA the next batch is copied on a side stream while the caller computes on the current one.
+    """
+    device = torch.device(device)
+    if device.type != "cuda":
+        for images, grating_info in data_loader:
+            yield images.to(device), grating_info.grating_side_rotation_deg.reshape(-1, 1).to(device)
+        return
+
+    copy_stream: torch.cuda.Stream = torch.cuda.Stream(device)
+
+    def copy_to_device(batch) -> Tuple[torch.Tensor, torch.Tensor]:
+        images, grating_info = batch
+        # DataLoader 已使用 pin_memory，non_blocking 的複製在 copy_stream 上與計算重疊
+        with torch.cuda.stream(copy_stream):
+            return images.to(device, non_blocking = True), grating_info.grating_side_rotation_deg.reshape(-1, 1).to(device, non_blocking = True)
+
+    batches = iter(data_loader)
+    batch = next(batches, None)
+    next_on_device = copy_to_device(batch) if batch is not None else None
+    while next_on_device is not None:
+        compute_stream: torch.cuda.Stream = torch.cuda.current_stream(device)
+        compute_stream.wait_stream(copy_stream)
+        images, targets = next_on_device
+        # 張量在 copy_stream 上配置，告知配置器它們也在計算串流上使用，避免記憶體被提早重用
+        images.record_stream(compute_stream)
+        targets.record_stream(compute_stream)
+
+        batch = next(batches, None)
+        next_on_device = copy_to_device(batch) if batch is not None else None
+        yield images, targets
+
+def train_epoch(model: nn.Module, train_loader: DataLoader, optimizer: optim.Optimizer, device: str | torch.device,
+                scaler: torch.amp.GradScaler | None, amp_dtype: torch.dtype | None = None, accum_steps: int = 1, augmentation: nn.Module | None = None) -> float:
+    """
+    Train the model for one epoch.
+    The forward pass and loss run under autocast with amp_dtype when it is set; scaler scales the loss for float16
+    and is None when no loss scaling is needed.
+    Gradients are accumulated over accum_steps batches before each optimizer step.
+    augmentation, if given, is applied to each batch on device before the forward pass.
+    Under DistributedDataParallel the batches that do not step skip the gradient all-reduce.
+    """
+    device_type: str = torch.device(device).type
+    # torch.compile 包在 DDP 外層，no_sync 需從 _orig_mod 取得
+    ddp_model: nn.Module = getattr(model, "_orig_mod", model)
+    no_sync = ddp_model.no_sync if isinstance(ddp_model, DistributedDataParallel) else contextlib.nullcontext
     model.train()
-    total_loss = 0.0
+    # 損失累加在裝置上，整個 epoch 結束才同步一次，避免每個 batch 的 .item() 讓 CPU 等待 GPU
+    total_loss: torch.Tensor = torch.zeros((), device = device)
     num_batches = 0
     
-    for images, grating_info in tqdm(train_loader, desc = "Training", leave = False):
-        images:torch.FloatTensor = images.to(device)
-        targets:torch.FloatTensor = grating_info.grating_side_rotation_deg.reshape(-1, 1).to(device)
+    # Zero gradients，設為 None 省去每步清零梯度緩衝區的寫入
+    optimizer.zero_grad(set_to_none = True)
+    for images, targets in tqdm(_iterate_on_device(train_loader, device), total = len(train_loader), desc = "Training", leave = False):
+        if augmentation is not None:
+            with torch.no_grad():
+                images = augmentation(images)
         
-        # Zero gradients
-        optimizer.zero_grad()
+        num_batches += 1
+        # epoch 最後不足 accum_steps 的 batch 也要更新，不把梯度帶到下一個 epoch
+        is_step: bool = num_batches % accum_steps == 0 or num_batches == len(train_loader)
+        # 以本組實際的 batch 數平均，最後不足 accum_steps 的一組梯度大小才與完整的組一致
+        group_size: int = min(accum_steps, len(train_loader) - (num_batches - 1) // accum_steps * accum_steps)
         
-        # Forward pass
-        outputs: torch.FloatTensor = model(images).to(dtype = torch.float32)
-        loss = criterion(outputs, targets)
+        # 不更新參數的 batch 只在本地累積梯度，DDP 只在更新前的 batch 做一次 all-reduce；
+        # DDP 在 forward 時就決定是否同步，因此 forward 也要在 no_sync 內
+        with contextlib.nullcontext() if is_step else no_sync():
+            # Forward pass，輸出轉為 float32 再計算 MSE，平均值在數值上較穩定
+            with torch.autocast(device_type = device_type, dtype = amp_dtype, enabled = amp_dtype is not None):
+                outputs: torch.Tensor = model(images)
+                loss = F.mse_loss(outputs.float(), targets)
+            
+            # Backward pass，累積的梯度為同一組 group_size 個 batch 的平均
+            # bfloat16 與 float32 不需 loss scaling，直接反向傳播並更新
+            if scaler is not None:
+                scaler.scale(loss / group_size).backward()
+            else:
+                (loss / group_size).backward()
         
-        # Backward pass
-        loss.backward()
-        optimizer.step()
+        if is_step:
+            if scaler is not None:
+                scaler.step(optimizer)
+                scaler.update()
+            else:
+                optimizer.step()
+            optimizer.zero_grad(set_to_none = True)
         
-        total_loss += loss.item()
-        num_batches += 1
+        total_loss += loss.detach()
     
-    return total_loss / num_batches
+    return (total_loss / num_batches).item()
 
-def evaluate_model(model: nn.Module, val_loader: DataLoader, criterion: nn.Module, device: str | torch.device) -> Tuple[float, float, float]:
-    """Evaluate the model on validation set"""
+def evaluate_model(model: nn.Module, val_loader: DataLoader, device: str | torch.device, amp_dtype: torch.dtype | None = None) -> Tuple[float, float, float]:
+    """Evaluate the model on validation set, under autocast with amp_dtype when it is set"""
+    device_type: str = torch.device(device).type
     model.eval()
-    total_loss = 0.0
-    total_rmse = 0.0
-    total_mae = 0.0
+    total_loss: torch.Tensor = torch.zeros((), device = device)
+    # RMSE 與 MAE 以整個驗證集的誤差總和計算，而非平均各 batch 的 RMSE
+    sum_squared_error: torch.Tensor = torch.zeros((), device = device)
+    sum_absolute_error: torch.Tensor = torch.zeros((), device = device)
+    num_samples = 0
     num_batches = 0
     
     with torch.no_grad():
-        for images, grating_info in tqdm(val_loader, desc = "Evaluating", leave = False):
-            images = images.to(device)
-            
-            # Extract target rotation angle
-            targets = grating_info.grating_side_rotation_deg.reshape(-1, 1).to(device)
-            
+        for images, targets in tqdm(_iterate_on_device(val_loader, device), total = len(val_loader), desc = "Evaluating", leave = False):
             # Forward pass
-            outputs = model(images).to(dtype = torch.float32)
-            loss:torch.FloatTensor = criterion(outputs, targets)
+            with torch.autocast(device_type = device_type, dtype = amp_dtype, enabled = amp_dtype is not None):
+                outputs = model(images)
+            outputs = outputs.float()
+            loss:torch.FloatTensor = F.mse_loss(outputs, targets)
             
             # Calculate metrics
-            rmse = torch.sqrt(torch.mean((outputs - targets) ** 2))
-            mae = torch.mean(torch.abs(outputs - targets))
+            error: torch.Tensor = outputs - targets
+            sum_squared_error += (error * error).sum()
+            sum_absolute_error += error.abs().sum()
+            num_samples += targets.numel()
             
-            total_loss += loss.item()
-            total_rmse += rmse.item()
-            total_mae += mae.item()
+            total_loss += loss
             num_batches += 1
     
-    avg_loss = total_loss / num_batches
-    avg_rmse = total_rmse / num_batches
-    avg_mae = total_mae / num_batches
+    avg_loss = (total_loss / num_batches).item()
+    avg_rmse = (sum_squared_error / num_samples).sqrt().item()
+    avg_mae = (sum_absolute_error / num_samples).item()
     
     return avg_loss, avg_rmse, avg_mae
 
-def _save_checkpoint(model: nn.Module, optimizer: optim.Optimizer, epoch: int, loss: float, rmse:float, filepath: str, device: torch.device, logger: logging.Logger) -> bool:
+def _save_checkpoint(model: nn.Module, optimizer: optim.Optimizer, epoch: int, loss: float, rmse:float, filepath: str, logger: logging.Logger) -> bool:
     """Save model checkpoint"""
     
-    model.to("cpu")
+    # torch.compile 包裝後的模型需取回原模型，否則 state_dict 的鍵會多出 _orig_mod. 前綴
+    model = getattr(model, "_orig_mod", model)
+    # DistributedDataParallel 同樣會在鍵前加上 module.
+    if isinstance(model, DistributedDataParallel):
+        model = model.module
+    # 只複製一份參數到 CPU，訓練中的模型留在原裝置上，不必來回搬移整個模型
     checkpoint = {
         'epoch': epoch,
-        'model_state_dict': model.state_dict(),
+        'model_state_dict': {name: tensor.detach().cpu() for name, tensor in model.state_dict().items()},
         'optimizer_state_dict': optimizer.state_dict(),
         'loss': loss,
         'rmse': rmse,
@@ -147,42 +296,15 @@ def _save_checkpoint(model: nn.Module, optimizer: optim.Optimizer, epoch: int, l
         torch.save(checkpoint, filepath)
         save_success = True
     except IOError as e:
-        model.to(device)
         logger.error("Failed to save checkpoint: %s", e)
 
-    model.to(device)
     return save_success
 
 def setup_logging(logger_name:str, log_dir: str, default_level: int = logging.INFO, log_to_file: bool = False, log_to_console: bool = True) -> logging.Logger:
     """Setup logging configuration"""
-    
-    # Create log directory
-    if log_to_file:
-        os.makedirs(log_dir, exist_ok=True)
-    
-    # Setup logger
-    logger = logging.getLogger(logger_name)
-    logger.setLevel(default_level)
-    
-    # Remove existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Create file handler
-    if log_to_file:
-        formatter = ColoredLoggingFormatter.instance()
-        file_handler = logging.FileHandler(os.path.join(log_dir, 'training.log'))
-        file_handler.setLevel(default_level)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
-    # Create console handler
-    if log_to_console:
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(default_level)
-        console_handler.setFormatter(ColoredLoggingFormatter.instance())
-        logger.addHandler(console_handler)
-    
+    log_file_path = os.path.join(log_dir, 'training.log') if log_to_file else None
+    logger, _ = ColoredConsoleLoggerFactorySingleton.instance().get_logger(
+        logger_name, log_to_console = log_to_console, log_file_path = log_file_path, log_level = default_level)
     return logger
 
 def parse_arguments() -> argparse.Namespace:
@@ -199,9 +321,18 @@ def parse_arguments() -> argparse.Namespace:
     
     # Training arguments
     parser.add_argument("--batch_size", type=int, default=16, help="Batch size for training")
+    parser.add_argument("--accum_steps", type=int, default=1, help="Number of batches to accumulate gradients over before each optimizer step")
     parser.add_argument("--learning_rate", type=float, default=1e-4, help="Learning rate for optimizer")
     parser.add_argument("--num_epochs", type=int, default=20, help="Number of training epochs")
     parser.add_argument("--train_ratio", type=float, default=0.8, help="Fraction of data to use for training (rest for validation)")
+    parser.add_argument("--num_workers", type=int, default=min(8, os.cpu_count() or 4), help="Number of DataLoader worker processes")
+    parser.add_argument("--no_image_cache", action="store_true", help="Resize and convert every image on each access instead of caching the preprocessed images")
+    parser.add_argument("--val_pin_memory", action="store_true", help="Use pinned memory for the validation loader")
+    parser.add_argument("--val_persistent_workers", action="store_true", help="Keep the validation loader workers alive between epochs")
+    parser.add_argument("--gpu_augmentation", action="store_true", help="Run the train augmentation on the GPU with Kornia instead of in the DataLoader workers")
+    parser.add_argument("--prefetch_factor", type=int, default=4, help="Batches each DataLoader worker keeps ready; large values raise host memory use")
+    parser.add_argument("--no_compile", action="store_true", help="Run the model eagerly instead of through torch.compile on CUDA")
+    parser.add_argument("--amp_dtype", type=str, default="auto", choices=["auto", "fp16", "bf16", "fp32"], help="Mixed precision dtype; auto picks bf16 if the GPU supports it, else fp16; fp32 disables mixed precision, as does running on CPU")
     
     # Logging and output arguments
     parser.add_argument("--log_dir", type=str, default="logs", help="Directory to save logs")
@@ -211,12 +342,34 @@ def parse_arguments() -> argparse.Namespace:
     
     return parser.parse_args()
 
+def _resolve_amp_dtype(amp_dtype: str, device: torch.device) -> torch.dtype | None:
+    """
+    Map the --amp_dtype argument to the autocast dtype, None meaning full float32.
+    bf16 falls back to float16 on GPUs without native support (compute capability below 8.0).
+    """
+    if amp_dtype == "fp32" or device.type != "cuda":
+        return None
+    bf16_supported: bool = torch.cuda.get_device_capability(device)[0] >= 8 and torch.cuda.is_bf16_supported()
+    if amp_dtype in ("auto", "bf16"):
+        return torch.bfloat16 if bf16_supported else torch.float16
+    return torch.float16
+
 def main():
     # Parse command line arguments
     args = parse_arguments()
     
     # Determine device
-    device: torch.device = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+    # 以 torchrun 啟動多個行程時改用 DistributedDataParallel，每個行程使用一張 GPU
+    distributed: bool = int(os.environ.get("WORLD_SIZE", 1)) > 1
+    local_rank: int = 0
+    if distributed:
+        local_rank = int(os.environ["LOCAL_RANK"])
+        torch.cuda.set_device(local_rank)
+        torch.distributed.init_process_group("nccl")
+        device: torch.device = torch.device("cuda", local_rank)
+    else:
+        device: torch.device = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+    is_main_process: bool = not distributed or torch.distributed.get_rank() == 0
     
     # Convert log level string to logging constant
     log_level = getattr(logging, args.log_level.upper())
@@ -232,6 +385,8 @@ def main():
     
     main_logger.debug("Starting training with arguments: %s", vars(args))
     main_logger.info("Using device: %s", device)
+    if distributed:
+        main_logger.info("Distributed training: rank %d of %d", torch.distributed.get_rank(), torch.distributed.get_world_size())
     
     # Create directories
     os.makedirs(args.model_save_dir, exist_ok=True)
@@ -244,21 +399,55 @@ def main():
         log_to_file=False,
         log_to_console= True
     )
+    # Kornia 為選用套件，未安裝時改回在 DataLoader worker 中做資料增強
+    augmentation: nn.Module | None = None
+    if args.gpu_augmentation and device.type == "cuda":
+        try:
+            augmentation = _create_gpu_augmentation(device)
+        except ImportError as e:
+            main_logger.warning("GPU augmentation needs kornia, augmenting in the DataLoader workers instead: %s", e)
+    
     train_loader: torch.utils.data.DataLoader
     val_loader: torch.utils.data.DataLoader
-    train_loader, val_loader = _create_data_loaders(args.root_dir, args.excel_file_path, args.batch_size, args.train_ratio, 4, data_loader_logger)
+    # 影像快取由 rank 0 建立，其他行程等它完成後再讀取，避免同時寫入同一個檔案
+    if distributed and not is_main_process:
+        torch.distributed.barrier()
+    train_loader, val_loader = _create_data_loaders(args.root_dir, args.excel_file_path, args.batch_size, args.train_ratio, args.num_workers, data_loader_logger, args.prefetch_factor, not args.no_image_cache,
+                                                     args.val_pin_memory, args.val_persistent_workers, augmentation is not None, distributed)
+    if distributed and is_main_process:
+        torch.distributed.barrier()
     
     data_loader_logger.info("Train samples: %d", len(train_loader.dataset))
     data_loader_logger.info("Validation samples: %d", len(val_loader.dataset))
     
     # Load model or create new one
     model = GratingRotationPredictorWithFftResnet18()
-    model = model.to(device)
-    
-    # Create optimizer and criterion
-    optimizer = optim.Adam(model.parameters(), lr=args.learning_rate)
-    criterion = nn.MSELoss()
-    
+    # 輸入尺寸固定，讓 cuDNN 先測試並快取最快的卷積演算法；float32 矩陣乘法允許使用 TF32
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision("high")
+    
+    # channels_last 讓 cuDNN 選用 NHWC 的卷積核心，搭配 autocast 可使用 tensor core
+    model = model.to(device, memory_format = torch.channels_last)
+    if distributed:
+        # DDP 以 bucket 為單位 all-reduce 梯度，與反向傳播重疊進行
+        model = DistributedDataParallel(model, device_ids = [local_rank])
+    
+    # Mixed precision；bfloat16 的指數範圍與 float32 相同，不需要 loss scaling
+    amp_dtype: torch.dtype | None = _resolve_amp_dtype(args.amp_dtype, device)
+    # 只有 float16 需要 GradScaler 的動態 loss scaling
+    scaler: torch.amp.GradScaler | None = torch.amp.GradScaler(device.type) if amp_dtype == torch.float16 else None
+    main_logger.info("Mixed precision: %s", amp_dtype if amp_dtype is not None else "off")
+    
+    if not args.no_compile and device.type == "cuda" and hasattr(torch, "compile"):
+        main_logger.info("Compiling model with torch.compile, this takes a while")
+        model = _compile_model(model, device, args.batch_size, amp_dtype, main_logger)
+    
+    # Create optimizer
+    # fused 將整個 Adam 更新合併為單一 CUDA kernel；舊版 torch 不支援時改用 foreach
+    try:
+        optimizer = optim.Adam(model.parameters(), lr=args.learning_rate, fused=(device.type == "cuda"))
+    except (TypeError, RuntimeError):
+        optimizer = optim.Adam(model.parameters(), lr=args.learning_rate, foreach=True)
     
     # Training variables
     best_val_loss = float('inf')
@@ -272,12 +461,16 @@ def main():
     start_time = time.time()
     
     for epoch in range(1, args.num_epochs + 1):
+        # 每個 epoch 更新 sampler 的亂數種子，否則各 epoch 的資料順序都相同
+        if distributed:
+            train_loader.sampler.set_epoch(epoch)
+        
         # Training
-        train_loss = train_epoch(model, train_loader, optimizer, criterion, device)
+        train_loss = train_epoch(model, train_loader, optimizer, device, scaler, amp_dtype, args.accum_steps, augmentation)
         train_losses.append(train_loss)
         
         # Validation (every epoch)
-        val_loss, val_rmse, val_mae = evaluate_model(model, val_loader, criterion, device)
+        val_loss, val_rmse, val_mae = evaluate_model(model, val_loader, device, amp_dtype)
         val_losses.append(val_loss)
         
         # Log results
@@ -290,8 +483,10 @@ def main():
             best_val_loss = val_loss
             best_val_rmse = val_rmse
             best_val_mae = val_mae
-            main_logger.info("Saving new best model with validation loss: %.4f, validation RMSE: %.4f, validation MAE: %.4f", val_loss, val_rmse, val_mae)
-            _save_checkpoint(model, optimizer, epoch, val_loss, val_rmse, os.path.join(args.model_save_dir, "best_model.pth"), device, main_logger)
+            # 各行程的模型參數相同，只由 rank 0 寫入檔案
+            if is_main_process:
+                main_logger.info("Saving new best model with validation loss: %.4f, validation RMSE: %.4f, validation MAE: %.4f", val_loss, val_rmse, val_mae)
+                _save_checkpoint(model, optimizer, epoch, val_loss, val_rmse, os.path.join(args.model_save_dir, "best_model.pth"), main_logger)
         
     # Training summary
     total_time = time.time() - start_time
@@ -301,6 +496,9 @@ def main():
     main_logger.info("Best validation RMSE: %.4f", best_val_rmse)
     main_logger.info("Best validation MAE: %.4f", best_val_mae)
     main_logger.info("Final model saved in : %s. Please use git-lfs to track and push this file to the repository.", args.model_save_dir)
+    
+    if distributed:
+        torch.distributed.destroy_process_group()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+import os
+from logging import Handler, StreamHandler, FileHandler
+from typing import Dict, List, Tuple
+from shared.LoggingFormatter import ColoredLoggingFormatter
+
+class ColoredConsoleLoggerFactorySingleton:
+    """Create colored loggers that share one set of handlers - Singleton implementation"""
+
+    _instance = None
+
+    def __init__(self):
+        self.__formatter: ColoredLoggingFormatter = ColoredLoggingFormatter.instance()
+        # 以 (目標, 等級) 快取 handler，多個 logger 共用同一組 handler
+        self.__console_handlers: Dict[int, StreamHandler] = {}
+        self.__file_handlers: Dict[Tuple[str, int], FileHandler] = {}
+        # 以名稱快取已設定的 logger，相同設定重複呼叫時不再重新掛載 handler
+        self.__loggers: Dict[str, Tuple[Tuple[bool, str | None, int], logging.Logger, Tuple[Handler, ...]]] = {}
+
+    @staticmethod
+    def instance() -> 'ColoredConsoleLoggerFactorySingleton':
+        if not ColoredConsoleLoggerFactorySingleton._instance:
+            ColoredConsoleLoggerFactorySingleton._instance = ColoredConsoleLoggerFactorySingleton()
+        return ColoredConsoleLoggerFactorySingleton._instance
+
+    def get_logger(self, logger_name: str, log_to_console: bool = True, log_file_path: str | None = None, log_level: int = logging.INFO) -> Tuple[logging.Logger, Tuple[Handler, ...]]:
+        """Return the named logger configured with the shared colored handlers.
+
+        Args:
+            logger_name (str): Name passed to logging.getLogger.
+            log_to_console (bool): Attach the console handler.
+            log_file_path (str | None): Attach a file handler writing to this path.
+            log_level (int): Level of the logger and its handlers.
+
+        Returns:
+            Tuple[logging.Logger, Tuple[Handler, ...]]: The logger and the handlers attached to it.
+        """
+        config = (log_to_console, log_file_path, log_level)
+        cached = self.__loggers.get(logger_name)
+        if cached is not None and cached[0] == config:
+            return cached[1], cached[2]
+
+        logger: logging.Logger = logging.getLogger(logger_name)
+        logger.handlers.clear()
+
+        handler_list: List[Handler] = []
+        if log_to_console:
+            handler_list.append(self.__get_console_handler(log_level))
+        if log_file_path is not None:
+            handler_list.append(self.__get_file_handler(log_file_path, log_level))
+        # 回傳不可變的 tuple，避免呼叫端修改快取中的 handler 清單
+        handlers: Tuple[Handler, ...] = tuple(handler_list)
+        for handler in handlers:
+            logger.addHandler(handler)
+
+        logger.setLevel(log_level)
+        logger.propagate = False
+        self.__loggers[logger_name] = (config, logger, handlers)
+        return logger, handlers
+
+    def clear_cache(self):
+        """Forget the configured loggers so the next get_logger call rebuilds them. Mainly for tests."""
+        for _, logger, handlers in self.__loggers.values():
+            for handler in handlers:
+                logger.removeHandler(handler)
+        for handler in self.__file_handlers.values():
+            handler.close()
+        self.__loggers.clear()
+        self.__console_handlers.clear()
+        self.__file_handlers.clear()
+
+    def __get_console_handler(self, log_level: int) -> StreamHandler:
+        handler: StreamHandler | None = self.__console_handlers.get(log_level)
+        if handler is None:
+            handler = StreamHandler()
+            handler.setFormatter(self.__formatter)
+            handler.setLevel(log_level)
+            self.__console_handlers[log_level] = handler
+        return handler
+
+    def __get_file_handler(self, file_path: str, log_level: int) -> FileHandler:
+        handler: FileHandler | None = self.__file_handlers.get((file_path, log_level))
+        if handler is None:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok = True)
+            handler = FileHandler(file_path)
+            handler.setFormatter(self.__formatter)
+            handler.setLevel(log_level)
+            self.__file_handlers[(file_path, log_level)] = handler
+        return handler
\ No newline at end of file